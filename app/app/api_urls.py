@@ -0,0 +1,11 @@
+"""URL Configuration of the API.
+
+Included by app.urls. app.wsgi serves the API with this URLconf alone, so
+its processes don't load the admin until an admin page is requested
+"""
+from django.urls import path, include
+
+urlpatterns = [
+    path('api/user/', include('user.urls')),
+    path('api/recipe/', include('recipe.urls')),
+]
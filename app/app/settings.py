@@ -32,7 +32,9 @@ ALLOWED_HOSTS = []
 
 INSTALLED_APPS = [
     # django apps
-    'django.contrib.admin',
+    # the admin modules of the apps are loaded by app.urls, so processes
+    # only serving the API (see API_URLCONF) don't import them
+    'django.contrib.admin.apps.SimpleAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -65,7 +67,17 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# The API is token authenticated and doesn't use sessions, csrf or messages,
+# so app.wsgi serves the paths under API_PATH_PREFIX with this shorter chain
+API_PATH_PREFIX = '/api/'
+API_MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
 ROOT_URLCONF = 'app.urls'
+# URLconf of the paths under API_PATH_PREFIX, without the admin
+API_URLCONF = 'app.api_urls'
 
 TEMPLATES = [
     {
@@ -118,6 +130,100 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+PASSWORD_HASHERS = [
+    'user.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+# PBKDF2 work factor, leave it empty to use the Django default
+PASSWORD_HASHING_ITERATIONS = int(
+    os.environ.get('PASSWORD_HASHING_ITERATIONS', 0)
+) or None
+# Password hashes running at once, how many more requests may wait for
+# their turn and for how long (seconds) before the API answers 503. The
+# bound is per process: with N worker processes up to N times
+# PASSWORD_HASHING_CONCURRENCY hashes run at once, so keep it low enough
+# that all of them together leave cores for the other requests
+PASSWORD_HASHING_CONCURRENCY = int(
+    os.environ.get('PASSWORD_HASHING_CONCURRENCY', 1)
+)
+PASSWORD_HASHING_QUEUE_LIMIT = int(
+    os.environ.get('PASSWORD_HASHING_QUEUE_LIMIT', 16)
+)
+PASSWORD_HASHING_TIMEOUT = float(
+    os.environ.get('PASSWORD_HASHING_TIMEOUT', 1.0)
+)
+
+
+# Above this many rows the admin and the paginated API lists show the
+# Postgres planner estimate of the number of rows instead of running
+# COUNT(*). Leave it empty to always count exactly
+ESTIMATED_COUNT_THRESHOLD = int(
+    os.environ.get('ESTIMATED_COUNT_THRESHOLD', 100000)
+) or None
+
+
+# core.tasks runs background tasks in a worker thread of each process, or
+# inline when BACKGROUND_TASKS_EAGER is set
+BACKGROUND_TASKS_EAGER = False
+
+# Rows per table deleted in each transaction when purging a deleted user
+USER_PURGE_BATCH_SIZE = 500
+
+
+# Serialized recipe details are cached for RECIPE_DETAIL_CACHE_TIMEOUT
+# seconds and dropped on writes. A write must drop them in every process,
+# so they are only cached when CACHE_BACKEND names a shared backend (i.e.
+# django.core.cache.backends.memcached.PyLibMCCache with CACHE_LOCATION).
+# The per-process default cache keeps them off
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+RECIPE_DETAIL_CACHE_TIMEOUT = int(os.environ.get(
+    'RECIPE_DETAIL_CACHE_TIMEOUT',
+    300 if os.environ.get('CACHE_BACKEND') else 0
+))
+
+# POSTs sent with an Idempotency-Key header have their response kept for
+# IDEMPOTENCY_KEY_TTL seconds and replayed to retries. A retry arriving
+# while the first request still runs waits up to IDEMPOTENCY_KEY_WAIT
+# seconds for its response before getting a 409. A request still without
+# a response after IDEMPOTENCY_KEY_LEASE seconds is taken for dead (its
+# worker was killed or timed out) and the next retry runs it again, keep
+# it at a few times the timeout of the WSGI server
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+IDEMPOTENCY_KEY_WAIT = 5.0
+IDEMPOTENCY_KEY_LEASE = 120
+
+# Days the change log behind the sync endpoint is kept. Apps with an older
+# cursor download their collections again
+CHANGE_LOG_RETENTION_DAYS = 30
+# Seconds a change waits before the sync endpoint serves it, so the cursor
+# never moves past a write whose transaction is still running. Keep it
+# above the longest request (i.e. the timeout of the WSGI server)
+CHANGE_LOG_SAFETY_LAG = int(os.environ.get('CHANGE_LOG_SAFETY_LAG', 30))
+
+# In-process cache of the tag/ingredient names of the users recently using
+# the autocomplete endpoints: how many users, for how long (seconds), and
+# the most names a user can have to be cached instead of searched in the
+# database
+AUTOCOMPLETE_CACHE_USERS = 1000
+AUTOCOMPLETE_CACHE_TTL = 300
+AUTOCOMPLETE_CACHE_MAX_ITEMS = 5000
+
+# In-process tag and ingredient bitsets of the recipes of the users recently
+# asking for similar recipes: how many users and for how long (seconds).
+# Writes of other processes are picked up when an index expires
+RECIPE_INDEX_USERS = 200
+RECIPE_INDEX_TTL = 600
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/2.1/topics/i18n/
@@ -141,6 +247,14 @@ MEDIA_URL = '/media/'
 
 # where to store media files
 MEDIA_ROOT = '/vol/web/media'
+
+# Recipe images nothing points to anymore are removed by core.media once
+# they are older than the grace period (seconds), which keeps the files of
+# uploads still in progress. Replacing or deleting images triggers a
+# background sweep at most every MEDIA_SWEEP_INTERVAL seconds per process
+MEDIA_SWEEP_GRACE_PERIOD = 3600
+MEDIA_SWEEP_INTERVAL = 3600
+
 # where to store static files
 STATIC_ROOT = '/vol/web/static'
 
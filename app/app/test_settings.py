@@ -0,0 +1,42 @@
+"""
+Settings for running the test suite.
+
+Used by default by `python manage.py test`. Tests run on an in-memory
+SQLite database with a cheap password hasher and keep uploaded media in a
+temporary directory. Run them in parallel with
+`python manage.py test --parallel`, or against Postgres with
+`python manage.py test --settings=app.settings`.
+"""
+import atexit
+import shutil
+import tempfile
+
+from app.settings import *  # noqa: F401,F403
+
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+# Hashing passwords properly is slow on purpose, tests don't need that
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+]
+
+# Uploaded images must not end up in the real media volume
+MEDIA_ROOT = tempfile.mkdtemp(prefix='recipe-app-test-media-')
+atexit.register(shutil.rmtree, MEDIA_ROOT, ignore_errors=True)
+
+# Background tasks run inline, inside the transaction of the test
+BACKGROUND_TASKS_EAGER = True
+
+# Cached values would outlive the rolled back test transactions, the tests
+# of the caches turn a real one on
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }
+}
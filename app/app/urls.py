@@ -14,12 +14,18 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path
 from django.conf.urls.static import static
 from django.conf import settings
 
+from app import api_urls
+
+# INSTALLED_APPS uses SimpleAdminConfig, the admin.py modules of the apps
+# are only imported when this URLconf is first loaded
+admin.autodiscover()
+
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/user/', include('user.urls')),
-    path('api/recipe/', include('recipe.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+] + api_urls.urlpatterns + static(
+    settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
+)
@@ -13,4 +13,11 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
+# get_wsgi_application() sets Django up, so it goes first
 application = get_wsgi_application()
+
+# the token authenticated API skips the session, csrf, messages and
+# clickjacking middleware that only the admin needs
+from core.wsgi import get_dispatching_application  # noqa: E402
+
+application = get_dispatching_application(application)
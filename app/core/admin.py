@@ -3,11 +3,22 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext as _
 
 from core import models
+from core.deletion import request_user_deletion
+from core.pagination import EstimatedCountPaginator
 
 
-class UserAdmin(BaseUserAdmin):
+class LargeTableAdmin(admin.ModelAdmin):
+    """Base admin for tables too big to be counted on every page view"""
+    paginator = EstimatedCountPaginator
+    # Skips the extra COUNT(*) of the whole table next to the search box
+    show_full_result_count = False
+
+
+class UserAdmin(BaseUserAdmin, LargeTableAdmin):
     ordering = ['id']
     list_display = ['email', 'name']
+    # prefix search can use the UPPER(email) index
+    search_fields = ['^email']
     fieldsets = (
         # title section
         (None, {'fields': ('email', 'password')}),
@@ -28,8 +39,51 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
 
+    def get_deleted_objects(self, objs, request):
+        """List only the users on the delete confirmation page, collecting
+           all of their recipes would take as long as deleting them
+        """
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(self.opts.verbose_name)
+        deleted_objects = [str(obj) for obj in objs]
+        model_count = {self.opts.verbose_name_plural: len(deleted_objects)}
+
+        return deleted_objects, model_count, perms_needed, []
+
+    def delete_model(self, request, obj):
+        """Deactivate the user, its data is deleted in the background"""
+        request_user_deletion(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            request_user_deletion(obj)
+
+
+class RecipeAttrAdmin(LargeTableAdmin):
+    """Admin for the tags and ingredients owned by users"""
+    ordering = ['-id']
+    list_display = ['name', 'user', 'recipe_count']
+    list_select_related = ['user']
+    # a plain id input instead of a select with every user as an option
+    raw_id_fields = ['user']
+    # Prefix search uses the UPPER(name) index. It also powers the
+    # autocomplete widgets of the recipe admin
+    search_fields = ['^name']
+
+
+class RecipeAdmin(LargeTableAdmin):
+    ordering = ['-id']
+    list_display = ['title', 'user', 'time_minutes', 'price']
+    list_select_related = ['user']
+    raw_id_fields = ['user']
+    # only the selected tags and ingredients are rendered, the rest are
+    # searched on demand
+    autocomplete_fields = ['tags', 'ingredients']
+    search_fields = ['^title']
+
 
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Tag)
-admin.site.register(models.Ingredient)
-admin.site.register(models.Recipe)
+admin.site.register(models.Tag, RecipeAttrAdmin)
+admin.site.register(models.Ingredient, RecipeAttrAdmin)
+admin.site.register(models.Recipe, RecipeAdmin)
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        # connects the receivers that keep the summary tables up to date
+        from core import signals  # noqa: F401
@@ -0,0 +1,192 @@
+from django.db import connections, transaction
+from django.db.models.signals import m2m_changed
+
+from core.changelog import log_changes
+from core.models import normalize_name
+
+
+def bulk_insert(model, objs, batch_size=None, using='default'):
+    """Bulk insert objects in batches the database backend can handle"""
+    objs = list(objs)
+    if not objs:
+        return objs
+    # Django only applies the limits of the backend (i.e. the number of
+    # sqlite variables) when no batch_size is given
+    max_batch_size = connections[using].ops.bulk_batch_size(
+        model._meta.concrete_fields, objs
+    )
+    batch_size = min(batch_size or max_batch_size, max_batch_size)
+
+    return model.objects.using(using).bulk_create(objs, batch_size=batch_size)
+
+
+def bulk_create_with_ids(model, objs, batch_size=None, using='default'):
+    """Bulk insert objects and make sure every one of them gets its pk"""
+    objs = list(objs)
+    if not objs:
+        return objs
+    connection = connections[using]
+    with transaction.atomic(using=using):
+        bulk_insert(model, objs, batch_size=batch_size, using=using)
+        # Postgres returns the ids straight from the INSERT ... RETURNING.
+        # Other backends (sqlite in development) don't, but they serialize
+        # writers, so inside this transaction the newest rows are ours
+        if not connection.features.can_return_ids_from_bulk_insert:
+            ids = list(
+                model.objects.using(using)
+                .order_by('-pk')
+                .values_list('pk', flat=True)[:len(objs)]
+            )
+            for obj, pk in zip(objs, reversed(ids)):
+                obj.pk = pk
+                obj._state.adding = False
+                obj._state.db = using
+
+    return objs
+
+
+def insert_ignore_conflicts(model, fields, rows, conflict_fields,
+                            batch_size=None, using='default'):
+    """Insert rows of values for fields with raw, batched
+       INSERT ... ON CONFLICT (conflict_fields) DO NOTHING statements.
+       Rows clashing with a unique constraint are skipped
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    connection = connections[using]
+    quote_name = connection.ops.quote_name
+    concrete_fields = [model._meta.get_field(field) for field in fields]
+    columns = ', '.join(quote_name(field.column) for field in concrete_fields)
+    conflict = ', '.join(
+        quote_name(model._meta.get_field(field).column)
+        for field in conflict_fields
+    )
+    placeholders = '(%s)' % ', '.join(['%s'] * len(fields))
+    max_batch_size = connection.ops.bulk_batch_size(concrete_fields, rows)
+    batch_size = min(batch_size or max_batch_size, max_batch_size)
+    with connection.cursor() as cursor:
+        for offset in range(0, len(rows), batch_size):
+            batch = rows[offset:offset + batch_size]
+            cursor.execute(
+                f'INSERT INTO {quote_name(model._meta.db_table)} '
+                f'({columns}) VALUES '
+                f'{", ".join([placeholders] * len(batch))} '
+                f'ON CONFLICT ({conflict}) DO NOTHING',
+                [value for row in batch for value in row]
+            )
+
+
+def _ids_by_name(model, pairs):
+    ids = {}
+    existing = model.objects.filter(
+        user_id__in={user_id for user_id, _ in pairs},
+        name__in={name for _, name in pairs}
+    ).values_list('user_id', 'name', 'id')
+    for user_id, name, pk in existing:
+        if (user_id, name) in pairs:
+            ids[(user_id, name)] = pk
+    return ids
+
+
+def upsert_names(model, pairs, batch_size=None):
+    """Return the ids of user owned objects by (user_id, name) pairs and
+       the pairs that were created.
+
+    The missing ones are inserted with INSERT ... ON CONFLICT DO NOTHING
+    against the (user, name) unique constraint, so concurrent requests
+    creating the same names don't fail or duplicate them (both of them
+    report those names as created)
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return {}, set()
+
+    ids = _ids_by_name(model, pairs)
+    missing = pairs - set(ids)
+    if not missing:
+        return ids, set()
+
+    # raw inserts skip pre_save, that fills name_normalized
+    insert_ignore_conflicts(
+        model,
+        ('user', 'name', 'name_normalized', 'recipe_count'),
+        (
+            (user_id, name, normalize_name(name), 0)
+            for user_id, name in sorted(missing)
+        ),
+        ('user', 'name'),
+        batch_size=batch_size
+    )
+    created = _ids_by_name(model, missing)
+    ids.update(created)
+    # nor do they send the post_save that logs the changes
+    log_changes(model, (
+        (user_id, pk) for (user_id, _), pk in created.items()
+    ))
+
+    return ids, set(created)
+
+
+def get_or_create_by_name(model, pairs, batch_size=None):
+    """Return the ids of user owned objects by (user_id, name) pairs,
+       creating with a single bulk insert the ones that don't exist yet
+    """
+    return upsert_names(model, pairs, batch_size)[0]
+
+
+def sync_m2m(instance, field_name, target_ids):
+    """Link instance through a many to many field to exactly target_ids.
+
+    The difference with the current links is worked out with one select
+    and applied with at most one delete and one bulk insert, nothing is
+    written when they already match. Sends m2m_changed like remove() and
+    add() do. Returns the added and removed ids
+    """
+    manager = getattr(instance, field_name)
+    through = manager.through
+    source = manager.source_field_name
+    target = manager.target_field_name
+    using = instance._state.db or 'default'
+    target_ids = set(target_ids)
+    current = set(
+        through.objects.using(using).filter(**{source: instance.pk})
+        .values_list(f'{target}_id', flat=True)
+    )
+    added, removed = target_ids - current, current - target_ids
+    if not added and not removed:
+        return added, removed
+
+    signal_kwargs = {
+        'sender': through,
+        'instance': instance,
+        'reverse': False,
+        'model': manager.model,
+        'using': using,
+    }
+    with transaction.atomic(using=using):
+        if removed:
+            m2m_changed.send(
+                action='pre_remove', pk_set=set(removed), **signal_kwargs
+            )
+            through.objects.using(using).filter(**{
+                source: instance.pk, f'{target}__in': removed
+            }).delete()
+            m2m_changed.send(
+                action='post_remove', pk_set=set(removed), **signal_kwargs
+            )
+        if added:
+            m2m_changed.send(
+                action='pre_add', pk_set=set(added), **signal_kwargs
+            )
+            bulk_insert(through, (
+                through(**{f'{source}_id': instance.pk, f'{target}_id': pk})
+                for pk in sorted(added)
+            ), using=using)
+            m2m_changed.send(
+                action='post_add', pk_set=set(added), **signal_kwargs
+            )
+    # like the related manager, forget the prefetched links
+    getattr(instance, '_prefetched_objects_cache', {}).pop(field_name, None)
+
+    return added, removed
@@ -0,0 +1,24 @@
+from core.models import ChangeLogEntry, Tag, Ingredient, Recipe
+
+
+OBJECT_TYPES = {
+    Recipe: ChangeLogEntry.RECIPE,
+    Tag: ChangeLogEntry.TAG,
+    Ingredient: ChangeLogEntry.INGREDIENT,
+}
+
+
+def log_changes(model, objects, deleted=False):
+    """Append to the change log that (user id, object id) pairs of a
+       model were written, or deleted
+    """
+    # without a batch_size Django keeps to the limits of the backend
+    return ChangeLogEntry.objects.bulk_create([
+        ChangeLogEntry(
+            user_id=user_id,
+            object_type=OBJECT_TYPES[model],
+            object_id=object_id,
+            deleted=deleted
+        )
+        for user_id, object_id in objects
+    ])
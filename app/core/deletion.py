@@ -0,0 +1,120 @@
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import (
+    Tag, Ingredient, Recipe, ChangeLogEntry, IdempotencyKey
+)
+from core.tasks import run_in_background
+
+
+logger = logging.getLogger(__name__)
+
+
+def request_user_deletion(user):
+    """Deactivate a user straight away and purge its data in the
+       background, deleting a big account in one go takes too long
+    """
+    user.is_active = False
+    user.deletion_requested_at = timezone.now()
+    user.save(update_fields=['is_active', 'deletion_requested_at'])
+    run_in_background(purge_user, user.pk)
+
+
+def _delete_where(model, field, values):
+    """Delete the rows whose field is one of values with a single raw
+       DELETE, no objects are loaded and no signals are sent
+    """
+    quote_name = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(values))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote_name(model._meta.db_table)} '
+            f'WHERE {quote_name(model._meta.get_field(field).column)} '
+            f'IN ({placeholders})',
+            list(values)
+        )
+        return cursor.rowcount
+
+
+def _remove_images(names):
+    """Remove the image files of deleted recipes"""
+    storage = Recipe._meta.get_field('image').storage
+    for name in names:
+        try:
+            storage.delete(name)
+        except OSError:
+            # a leftover file wastes space but breaks nothing
+            logger.warning('Could not remove %s', name, exc_info=True)
+
+
+def _purge_recipes(user_id, batch_size):
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Recipe.objects.filter(user_id=user_id)
+                .order_by('id').values_list('id', 'image')[:batch_size]
+            )
+            if not rows:
+                return deleted
+            recipe_ids = [pk for pk, _ in rows]
+            _delete_where(Recipe.tags.through, 'recipe', recipe_ids)
+            _delete_where(Recipe.ingredients.through, 'recipe', recipe_ids)
+            deleted += _delete_where(Recipe, 'id', recipe_ids)
+        # only once the rows are gone for good
+        _remove_images(image for _, image in rows if image)
+
+
+def _purge_owned(model, through, field, user_id, batch_size):
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                model.objects.filter(user_id=user_id)
+                .order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return deleted
+            if through is not None:
+                # links left from recipes of other users
+                _delete_where(through, field, ids)
+            deleted += _delete_where(model, 'id', ids)
+
+
+def purge_user(user_id, batch_size=None):
+    """Delete a user that asked for it together with everything it owns,
+       in short transactions of at most batch_size rows per table.
+
+    Returns how many recipes, tags and ingredients were deleted, None when
+    the user doesn't exist or didn't ask to be deleted
+    """
+    batch_size = batch_size or settings.USER_PURGE_BATCH_SIZE
+    User = get_user_model()
+    if not User.objects.filter(
+        pk=user_id, deletion_requested_at__isnull=False
+    ).exists():
+        return None
+
+    counts = {
+        'recipes': _purge_recipes(user_id, batch_size),
+        'tags': _purge_owned(
+            Tag, Recipe.tags.through, 'tag', user_id, batch_size
+        ),
+        'ingredients': _purge_owned(
+            Ingredient, Recipe.ingredients.through, 'ingredient', user_id,
+            batch_size
+        ),
+    }
+    # the change log of a user can outgrow its recipes
+    for model in (ChangeLogEntry, IdempotencyKey):
+        _purge_owned(model, None, None, user_id, batch_size)
+    # what is left (token, summary, permissions) is small enough for the
+    # regular cascade
+    User.objects.filter(pk=user_id).delete()
+    logger.info('Purged user %s: %s', user_id, counts)
+
+    return counts
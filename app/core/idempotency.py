@@ -0,0 +1,177 @@
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.models import IdempotencyKey
+
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+# how often a retry checks whether the first request finished
+POLL_INTERVAL = 0.05
+
+
+def _uploaded_file(value):
+    """Stand in for uploaded files in the fingerprint of a request"""
+    name, size = getattr(value, 'name', None), getattr(value, 'size', None)
+    if name is None:
+        raise TypeError(f'{type(value).__name__} is not JSON serializable')
+    return f'{name}:{size}'
+
+
+def request_fingerprint(request):
+    """Hash the method, path and payload of a request"""
+    data = request.data
+    if hasattr(data, 'getlist'):
+        data = {key: data.getlist(key) for key in data}
+    payload = json.dumps(
+        [request.method, request.path, data],
+        sort_keys=True, cls=JSONEncoder, default=_uploaded_file
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _replay(record):
+    response = Response(
+        json.loads(record.response_body) if record.response_body else None,
+        status=record.status_code
+    )
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _claim(user, key, fingerprint):
+    """Create the record of a key, return None when it is already taken"""
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                user=user, key=key, request_fingerprint=fingerprint
+            )
+    except IntegrityError:
+        return None
+
+
+def _expired(record):
+    return record.created_at < timezone.now() - timedelta(
+        seconds=settings.IDEMPOTENCY_KEY_TTL
+    )
+
+
+def _abandoned(record):
+    """Whether the request that claimed a record died before responding
+       (the worker was killed or timed out)
+    """
+    return record.status_code is None and \
+        record.created_at < timezone.now() - timedelta(
+            seconds=settings.IDEMPOTENCY_KEY_LEASE
+        )
+
+
+def _wait_for(record):
+    """Wait up to IDEMPOTENCY_KEY_WAIT seconds for the request of a record
+       to finish, return the record then. None when the request failed and
+       released the key
+    """
+    deadline = time.monotonic() + settings.IDEMPOTENCY_KEY_WAIT
+    while record is not None and record.status_code is None and \
+            time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        record = IdempotencyKey.objects.filter(pk=record.pk).first()
+    return record
+
+
+def _conflict():
+    return Response(
+        {'detail': 'A request with this Idempotency-Key is in progress.'},
+        status=status.HTTP_409_CONFLICT
+    )
+
+
+def idempotent(view_method):
+    """Make a POST view method replay its first response to the retries
+       sent with the same Idempotency-Key header by the same user.
+
+    The first request claims the key with a unique row, so concurrent
+    duplicates wait for its response instead of writing again. Returned
+    responses below 500 are kept for IDEMPOTENCY_KEY_TTL seconds. Raised
+    exceptions (validation errors included) and server errors release the
+    key, nothing was written so the request can be sent again. So does a
+    request that never responded within IDEMPOTENCY_KEY_LEASE seconds
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > 255:
+            raise ValidationError(
+                {'idempotency_key': ['At most 255 characters.']}
+            )
+        fingerprint = request_fingerprint(request)
+
+        record = _claim(request.user, key, fingerprint)
+        if record is None:
+            existing = IdempotencyKey.objects.filter(
+                user=request.user, key=key
+            ).first()
+            if existing is not None and _expired(existing):
+                # past its TTL the key can be used for a new request
+                existing.delete()
+                existing = None
+            elif existing is not None and _abandoned(existing):
+                # no response is coming, the retry runs the request. Only
+                # one of several concurrent retries deletes the claim
+                IdempotencyKey.objects.filter(
+                    pk=existing.pk, status_code__isnull=True
+                ).delete()
+                existing = None
+            if existing is not None:
+                if existing.request_fingerprint != fingerprint:
+                    return Response(
+                        {'detail': 'This Idempotency-Key was used with a '
+                                   'different request.'},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                    )
+                existing = _wait_for(existing)
+                if existing is not None:
+                    if existing.status_code is None:
+                        return _conflict()
+                    return _replay(existing)
+            # the key was released in the meantime
+            record = _claim(request.user, key, fingerprint)
+            if record is None:
+                return _conflict()
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+        if response.status_code >= 500:
+            record.delete()
+            return response
+
+        record.status_code = response.status_code
+        record.response_body = json.dumps(response.data, cls=JSONEncoder) \
+            if response.data is not None else ''
+        record.save(update_fields=['status_code', 'response_body'])
+        return response
+
+    return wrapper
+
+
+def clear_expired_keys():
+    """Delete the keys older than IDEMPOTENCY_KEY_TTL, return how many"""
+    cutoff = timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,75 @@
+import logging
+import time
+from wsgiref.util import setup_testing_defaults
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+
+from core.wsgi import LeanWSGIHandler
+
+
+def _time_requests(application, environ, requests):
+    """Send the same request over and over, return the seconds it took"""
+    def start_response(status, headers, exc_info=None):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = application(dict(environ), start_response)
+        # iterating and closing is what servers do, close() fires
+        # request_finished
+        for _ in response:
+            pass
+        response.close()
+    return time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    """Django command to compare the full and API middleware chains"""
+    help = (
+        'Measure the time per request of an API path through the full '
+        'MIDDLEWARE chain and through API_MIDDLEWARE'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default='/api/recipe/tags/',
+            help='Path requested, unauthenticated API calls are fine'
+        )
+        parser.add_argument(
+            '--host', default='localhost',
+            help='Host header sent, must be in ALLOWED_HOSTS'
+        )
+        parser.add_argument(
+            '--requests', type=int, default=2000,
+            help='Requests sent through every chain'
+        )
+
+    def handle(self, *args, **options):
+        requests = options['requests']
+        if requests < 1:
+            raise CommandError('--requests must be positive')
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': options['path'],
+            'HTTP_HOST': options['host'],
+        }
+        setup_testing_defaults(environ)
+
+        # don't log a warning for every 4xx response
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        results = {}
+        for name, application in (('full', WSGIHandler()),
+                                  ('api', LeanWSGIHandler())):
+            # warm up the url resolver and the database connection
+            _time_requests(application, environ, 10)
+            results[name] = _time_requests(
+                application, environ, requests
+            ) / requests * 1e6
+            self.stdout.write(f'{name}: {results[name]:.1f}µs per request')
+
+        saved = results['full'] - results['api']
+        self.stdout.write(self.style.SUCCESS(
+            f'The API chain saves {saved:.1f}µs per request '
+            f'({saved / results["full"]:.0%})'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.idempotency import clear_expired_keys
+
+
+class Command(BaseCommand):
+    """Django command to delete the expired idempotency keys"""
+    help = 'Delete the idempotency keys older than IDEMPOTENCY_KEY_TTL'
+
+    def handle(self, *args, **options):
+        deleted = clear_expired_keys()
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} expired idempotency keys'
+        ))
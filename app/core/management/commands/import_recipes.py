@@ -0,0 +1,250 @@
+import json
+import multiprocessing
+import time
+import zlib
+from collections import Counter, defaultdict
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from core.bulk import (
+    bulk_insert, bulk_create_with_ids, get_or_create_by_name
+)
+from core.changelog import log_changes
+from core.models import Tag, Ingredient, Recipe
+from core.stats import adjust_recipe_counts, adjust_recipe_stats
+
+
+def parse_line(line, default_user=None):
+    """Validate a JSON line and return it as a dict ready to be imported"""
+    data = json.loads(line)
+    if not isinstance(data, dict):
+        raise ValueError('each line must be a JSON object')
+    email = data.get('user') or default_user
+    if not email:
+        raise ValueError('no user given')
+    title = str(data.get('title') or '').strip()
+    if not title:
+        raise ValueError('title is required')
+    try:
+        price = Decimal(str(data['price'])).quantize(Decimal('0.01'))
+        time_minutes = int(data['time_minutes'])
+    except (KeyError, TypeError, ValueError, InvalidOperation):
+        raise ValueError('time_minutes and price must be numbers')
+
+    return {
+        'user': get_user_model().objects.normalize_email(email),
+        'title': title[:255],
+        'time_minutes': time_minutes,
+        'price': price,
+        'link': str(data.get('link') or '')[:255],
+        'tags': _names(data.get('tags')),
+        'ingredients': _names(data.get('ingredients')),
+    }
+
+
+def _names(names):
+    """Clean a list of tag or ingredient names, dropping the duplicates"""
+    cleaned = []
+    for name in names or []:
+        name = str(name).strip()[:255]
+        if name and name not in cleaned:
+            cleaned.append(name)
+    return cleaned
+
+
+def partition_of(email, workers):
+    """Return the worker that imports the recipes of a user"""
+    # crc32 is stable across processes unlike the builtin hash()
+    return zlib.crc32(email.encode()) % workers
+
+
+def read_partition(path, worker, workers, default_user):
+    """Yield the valid recipes of the file that belong to a worker"""
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                recipe = parse_line(line, default_user)
+            except ValueError as exc:
+                # only one worker reports each broken line
+                if worker == 0:
+                    yield number, None, str(exc)
+                continue
+            if partition_of(recipe['user'], workers) == worker:
+                yield number, recipe, None
+
+
+def import_batch(recipes):
+    """Insert a batch of recipes with their tags and ingredients"""
+    users = dict(
+        get_user_model().objects.filter(
+            email__in={recipe['user'] for recipe in recipes}
+        ).values_list('email', 'id')
+    )
+    recipes = [recipe for recipe in recipes if recipe['user'] in users]
+    for recipe in recipes:
+        recipe['user_id'] = users[recipe['user']]
+
+    tag_ids = get_or_create_by_name(Tag, (
+        (recipe['user_id'], name)
+        for recipe in recipes for name in recipe['tags']
+    ))
+    ingredient_ids = get_or_create_by_name(Ingredient, (
+        (recipe['user_id'], name)
+        for recipe in recipes for name in recipe['ingredients']
+    ))
+    objs = bulk_create_with_ids(Recipe, (
+        Recipe(
+            user_id=recipe['user_id'],
+            title=recipe['title'],
+            time_minutes=recipe['time_minutes'],
+            price=recipe['price'],
+            link=recipe['link']
+        )
+        for recipe in recipes
+    ))
+    bulk_insert(Recipe.tags.through, (
+        Recipe.tags.through(
+            recipe_id=obj.pk,
+            tag_id=tag_ids[(obj.user_id, name)]
+        )
+        for obj, recipe in zip(objs, recipes)
+        for name in recipe['tags']
+    ))
+    bulk_insert(Recipe.ingredients.through, (
+        Recipe.ingredients.through(
+            recipe_id=obj.pk,
+            ingredient_id=ingredient_ids[(obj.user_id, name)]
+        )
+        for obj, recipe in zip(objs, recipes)
+        for name in recipe['ingredients']
+    ))
+    # bulk inserts skip the signals that maintain the summaries and the
+    # change log. Adding what the batch changed keeps every batch as cheap
+    # as the first one, rebuilding rescans all the recipes of the users
+    totals = defaultdict(lambda: [0, 0, Decimal(0)])
+    for obj in objs:
+        total = totals[obj.user_id]
+        total[0] += 1
+        total[1] += obj.time_minutes
+        total[2] += obj.price
+    for user_id, (count, time_minutes, price) in totals.items():
+        adjust_recipe_stats(user_id, count, time_minutes, price)
+    for model, ids, field in ((Tag, tag_ids, 'tags'),
+                              (Ingredient, ingredient_ids, 'ingredients')):
+        links = Counter(
+            ids[(recipe['user_id'], name)]
+            for recipe in recipes for name in recipe[field]
+        )
+        by_delta = defaultdict(list)
+        for pk, delta in links.items():
+            by_delta[delta].append(pk)
+        for delta, pks in by_delta.items():
+            adjust_recipe_counts(model, pks, delta)
+    log_changes(Recipe, ((obj.user_id, obj.pk) for obj in objs))
+
+    return len(objs)
+
+
+def import_partition(path, worker, workers, batch_size, default_user):
+    """Import every recipe of one worker partition of the file"""
+    counts = {'imported': 0, 'skipped': 0, 'errors': []}
+    rows = read_partition(path, worker, workers, default_user)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        recipes = [recipe for _, recipe, _ in batch if recipe]
+        counts['errors'].extend(
+            (number, error) for number, _, error in batch if error
+        )
+        with transaction.atomic():
+            imported = import_batch(recipes)
+        counts['imported'] += imported
+        counts['skipped'] += len(recipes) - imported
+
+    return counts
+
+
+def _run_worker(args):
+    """Entry point of the worker processes"""
+    try:
+        return import_partition(*args)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    """Django command to bulk import recipes from a JSON Lines file"""
+    help = (
+        'Import recipes from a JSON Lines file. Each line is an object with '
+        'user (email), title, time_minutes, price, link, tags and '
+        'ingredients (lists of names)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--user',
+            help='Email of the owner of the lines without a user'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Recipes inserted per transaction'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Processes importing in parallel, partitioned by user'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--batch-size and --workers must be positive')
+        workers = options['workers']
+        if workers > 1 and connections['default'].vendor == 'sqlite':
+            raise CommandError('sqlite does not support parallel writers')
+        try:
+            open(options['path']).close()
+        except OSError as exc:
+            raise CommandError(f'Cannot read {options["path"]}: {exc}')
+
+        start = time.monotonic()
+        jobs = [
+            (
+                options['path'],
+                worker,
+                workers,
+                options['batch_size'],
+                options['user'],
+            )
+            for worker in range(workers)
+        ]
+        if workers == 1:
+            results = [import_partition(*jobs[0])]
+        else:
+            # Forked children must not share the connection of the parent
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            with context.Pool(workers) as pool:
+                results = pool.map(_run_worker, jobs)
+
+        imported = sum(result['imported'] for result in results)
+        skipped = sum(result['skipped'] for result in results)
+        errors = sorted(
+            error for result in results for error in result['errors']
+        )
+        for number, error in errors:
+            self.stderr.write(f'Line {number}: {error}')
+        if skipped:
+            self.stderr.write(f'{skipped} recipes skipped, unknown user')
+
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} recipes in {elapsed:.1f}s '
+            f'({len(errors)} invalid lines)'
+        ))
@@ -0,0 +1,146 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Run in a fresh interpreter, this process has everything imported already.
+# Prints the seconds every startup stage took and which of the modules
+# that should load lazily were imported by the time the API is ready
+PROBE = '''
+import json, sys, time
+from importlib import import_module
+
+stages = []
+start = time.perf_counter()
+import django
+django.setup()
+stages.append(('app ready', time.perf_counter() - start))
+
+from django.conf import settings
+from django.urls import get_resolver
+
+start = time.perf_counter()
+import_module(settings.WSGI_APPLICATION.rsplit('.', 1)[0])
+stages.append(('wsgi application', time.perf_counter() - start))
+
+start = time.perf_counter()
+get_resolver(settings.API_URLCONF).url_patterns
+stages.append(('API URLconf', time.perf_counter() - start))
+lazy = {name: name in sys.modules for name in %(lazy)r}
+
+start = time.perf_counter()
+get_resolver(settings.ROOT_URLCONF).url_patterns
+stages.append(('full URLconf', time.perf_counter() - start))
+
+print(json.dumps({'stages': stages, 'lazy': lazy}))
+'''
+
+# modules the API processes should only import when they first need them
+LAZY_MODULES = ('numpy', 'PIL', 'django.contrib.auth.admin', 'core.admin')
+
+IMPORT_TIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+
+def parse_import_times(output):
+    """Return the (self µs, cumulative µs, depth, module) of every line of
+       -X importtime output
+    """
+    imports = []
+    for line in output.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match:
+            imports.append((
+                int(match.group(1)),
+                int(match.group(2)),
+                len(match.group(3)) // 2,
+                match.group(4),
+            ))
+    return imports
+
+
+def run_probe():
+    """Start the project in a new interpreter, return its report and the
+       times of its imports
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         PROBE % {'lazy': LAZY_MODULES}],
+        cwd=settings.BASE_DIR, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True
+    )
+    if process.returncode:
+        raise CommandError(
+            f'The startup probe failed:\n{process.stderr[-2000:]}'
+        )
+    report = json.loads(process.stdout.strip().splitlines()[-1])
+    return report, parse_import_times(process.stderr)
+
+
+class Command(BaseCommand):
+    """Django command to measure how long a process takes to start"""
+    help = (
+        'Start the project in new interpreters and report the time to get '
+        'the apps ready, load the WSGI application and the URLconfs, the '
+        'packages taking the most import time and the lazily loaded '
+        'modules imported anyway'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--runs', type=int, default=3,
+            help='Cold starts measured, their median is reported'
+        )
+        parser.add_argument(
+            '--top', type=int, default=15,
+            help='Packages and modules listed'
+        )
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1 or options['top'] < 1:
+            raise CommandError('--runs and --top must be positive')
+
+        runs = [run_probe() for _ in range(options['runs'])]
+        self.stdout.write('Startup stages (median of '
+                          f'{options["runs"]} runs):')
+        total = 0
+        for i, (stage, _) in enumerate(runs[0][0]['stages']):
+            seconds = statistics.median(
+                report['stages'][i][1] for report, _ in runs
+            )
+            total += seconds
+            self.stdout.write(f'  {stage:<18}{seconds * 1000:8.1f}ms')
+        self.stdout.write(f'  {"total":<18}{total * 1000:8.1f}ms')
+
+        report, imports = runs[-1]
+        top = options['top']
+        packages = defaultdict(int)
+        for own, _, _, module in imports:
+            packages[module.split('.')[0]] += own
+        self.stdout.write(f'Import time by package (top {top}):')
+        for package, own in sorted(packages.items(),
+                                   key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'  {package:<32}{own / 1000:8.1f}ms')
+
+        # the imports not nested in another one (the apps, URLconfs and
+        # views Django loads by name), with everything they pulled in
+        roots = [item for item in imports if item[2] == 0]
+        self.stdout.write(f'Slowest imports, cumulative (top {top}):')
+        for _, cumulative, _, module in sorted(
+                roots, key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'  {module:<32}{cumulative / 1000:8.1f}ms')
+
+        self.stdout.write('Lazy modules once the API is ready:')
+        for module, loaded in report['lazy'].items():
+            line = f'  {module:<32}{"loaded" if loaded else "not loaded"}'
+            self.stdout.write(
+                self.style.WARNING(line) if loaded else line
+            )
@@ -0,0 +1,183 @@
+import csv
+import json
+import multiprocessing
+import os
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from core.bulk import bulk_insert
+
+
+def read_rows(path):
+    """Yield the (line number, dict) rows of a CSV (with a header line) or
+       JSON Lines file
+    """
+    with open(path, encoding='utf-8', newline='') as f:
+        if path.endswith('.csv'):
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield number, row
+
+
+def parse_row(row):
+    """Validate a row and return its (email, name, password)"""
+    if not isinstance(row, dict):
+        raise ValueError('each line must be a JSON object')
+    email = str(row.get('email') or '').strip()
+    try:
+        validate_email(email)
+    except ValidationError:
+        raise ValueError(f'invalid email {email!r}')
+    email = get_user_model().objects.normalize_email(email)
+    name = str(row.get('name') or '').strip() or email.split('@')[0]
+    # users without a password get an unusable one, like create_user
+    password = row.get('password')
+    password = str(password) if password else None
+
+    return email, name[:255], password
+
+
+def hash_passwords(passwords, pool=None, workers=1):
+    """Hash a list of passwords, across the workers of pool if any"""
+    if pool is None:
+        return [make_password(password) for password in passwords]
+    # a few chunks per worker evens out their load
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return pool.map(make_password, passwords, chunksize=chunksize)
+
+
+class Command(BaseCommand):
+    """Django command to create users in bulk from a CSV or JSONL file"""
+    help = (
+        'Create users from a CSV file (with an email,name,password header) '
+        'or a JSON Lines file of objects with the same keys. Passwords are '
+        'hashed in parallel and the users inserted in batches. Emails that '
+        'are already registered are skipped'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Users hashed and inserted per transaction'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Processes hashing passwords in parallel, at most '
+                 f'{os.cpu_count() or 1} (the CPU count) are useful'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--batch-size and --workers must be positive')
+        try:
+            open(options['path']).close()
+        except OSError as exc:
+            raise CommandError(f'Cannot read {options["path"]}: {exc}')
+
+        pool = None
+        # daemonic processes (i.e. the workers of a parallel test run)
+        # can't start a pool of their own, they hash inline
+        if options['workers'] > 1 and \
+                not multiprocessing.current_process().daemon:
+            # The workers only hash, they never use the database connection
+            # the forked children inherit
+            context = multiprocessing.get_context('fork')
+            pool = context.Pool(options['workers'])
+        try:
+            counts = self._provision(options, pool)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        for number, error in counts['errors']:
+            self.stderr.write(f'Line {number}: {error}')
+        if counts['skipped']:
+            self.stderr.write(
+                f"{counts['skipped']} users skipped, email already taken"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {counts['created']} users in {counts['elapsed']:.1f}s "
+            f"({counts['created'] / max(counts['elapsed'], 1e-6):.0f} "
+            f"users/s, {len(counts['errors'])} invalid lines)"
+        ))
+
+    def _provision(self, options, pool):
+        counts = {'created': 0, 'skipped': 0, 'errors': []}
+        seen = set()
+        start = time.monotonic()
+        rows = read_rows(options['path'])
+        while True:
+            batch = list(islice(rows, options['batch_size']))
+            if not batch:
+                break
+            users = []
+            for number, row in batch:
+                try:
+                    email, name, password = parse_row(row)
+                except ValueError as exc:
+                    counts['errors'].append((number, str(exc)))
+                    continue
+                if email in seen:
+                    counts['errors'].append(
+                        (number, f'duplicate email {email!r}')
+                    )
+                    continue
+                seen.add(email)
+                users.append((email, name, password))
+
+            created = self._create_users(users, pool, options)
+            counts['created'] += created
+            counts['skipped'] += len(users) - created
+            elapsed = time.monotonic() - start
+            self.stdout.write(
+                f"{counts['created']} users created "
+                f"({counts['created'] / max(elapsed, 1e-6):.0f} users/s)..."
+            )
+
+        counts['elapsed'] = time.monotonic() - start
+        return counts
+
+    def _create_users(self, users, pool, options):
+        """Hash the passwords of a batch of users and insert the ones whose
+           email isn't registered yet, return how many
+        """
+        model = get_user_model()
+        existing = set(model.objects.filter(
+            email__in=[email for email, _, _ in users]
+        ).values_list('email', flat=True))
+        users = [user for user in users if user[0] not in existing]
+        if not users:
+            return 0
+        # hashing is by far the slowest part, the only one done in parallel
+        hashes = hash_passwords(
+            [password for _, _, password in users], pool, options['workers']
+        )
+        with transaction.atomic():
+            bulk_insert(
+                model,
+                (
+                    model(email=email, name=name, password=password_hash)
+                    for (email, name, _), password_hash in zip(users, hashes)
+                ),
+                batch_size=options['batch_size']
+            )
+
+        return len(users)
@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import ChangeLogEntry
+
+
+class Command(BaseCommand):
+    """Django command to delete the old entries of the change log"""
+    help = (
+        'Delete the change log entries older than the retention period. '
+        'Apps syncing from an older cursor are asked to download again'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.CHANGE_LOG_RETENTION_DAYS,
+            help='Days of changes kept'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Entries deleted per query'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--days and --batch-size must be positive')
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        # ids grow with time, so everything below the first entry to keep
+        # goes, in short deletes walking up the primary key
+        keep_from = ChangeLogEntry.objects.filter(
+            created_at__gte=cutoff
+        ).order_by('id').values_list('id', flat=True).first()
+        if keep_from is None:
+            keep_from = (ChangeLogEntry.objects.order_by('-id').values_list(
+                'id', flat=True
+            ).first() or 0) + 1
+
+        deleted = 0
+        while True:
+            ids = list(ChangeLogEntry.objects.filter(
+                id__lt=keep_from
+            ).order_by('id').values_list('id', flat=True)[
+                :options['batch_size']
+            ])
+            if not ids:
+                break
+            deleted += ChangeLogEntry.objects.filter(
+                id__gte=ids[0], id__lte=ids[-1]
+            ).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} change log entries'
+        ))
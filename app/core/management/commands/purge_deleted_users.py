@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.deletion import purge_user
+
+
+class Command(BaseCommand):
+    """Django command to purge the users that asked to be deleted"""
+    help = (
+        'Delete the users waiting to be purged with all of their recipes, '
+        'tags, ingredients and images. Picks up the purges interrupted by '
+        'a restart'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', dest='emails', default=[],
+            help='Only purge this user, can be given several times'
+        )
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.USER_PURGE_BATCH_SIZE,
+            help='Rows per table deleted in each transaction'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        users = get_user_model().objects.filter(
+            deletion_requested_at__isnull=False
+        ).order_by('deletion_requested_at')
+        if options['emails']:
+            users = users.filter(email__in=options['emails'])
+
+        purged = 0
+        for user_id, email in users.values_list('id', 'email'):
+            counts = purge_user(user_id, batch_size=options['batch_size'])
+            if counts is None:
+                continue
+            purged += 1
+            self.stdout.write(
+                f'{email}: {counts["recipes"]} recipes, {counts["tags"]} '
+                f'tags and {counts["ingredients"]} ingredients deleted'
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} users'))
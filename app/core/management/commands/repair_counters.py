@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.stats import rebuild_recipe_counts, rebuild_recipe_stats
+
+
+class Command(BaseCommand):
+    """Django command to recompute the maintained recipe counters"""
+    help = (
+        'Recompute the recipe statistics of users and the recipe_count of '
+        'their tags and ingredients from the recipes tables'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', dest='emails', default=[],
+            help='Only repair this user, can be given several times'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Users repaired per transaction'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        users = get_user_model().objects.order_by('id')
+        if options['emails']:
+            users = users.filter(email__in=options['emails'])
+
+        user_ids = list(users.values_list('id', flat=True))
+        step = options['batch_size']
+        for offset in range(0, len(user_ids), step):
+            batch = user_ids[offset:offset + step]
+            with transaction.atomic():
+                rebuild_recipe_stats(batch)
+                rebuild_recipe_counts(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Repaired the counters of {len(user_ids)} users'
+        ))
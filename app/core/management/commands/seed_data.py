@@ -0,0 +1,210 @@
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.bulk import bulk_insert, bulk_create_with_ids
+from core.models import Tag, Ingredient, Recipe
+from core.stats import rebuild_recipe_counts, rebuild_recipe_stats
+
+
+ADJECTIVES = (
+    'Spicy', 'Sweet', 'Smoky', 'Crispy', 'Creamy', 'Tangy', 'Roasted',
+    'Grilled', 'Baked', 'Fresh', 'Hearty', 'Zesty',
+)
+DISHES = (
+    'curry', 'salad', 'soup', 'stew', 'pasta', 'risotto', 'tacos',
+    'pie', 'burger', 'noodles', 'omelette', 'cake',
+)
+TAG_NAMES = (
+    'Vegan', 'Vegetarian', 'Dessert', 'Breakfast', 'Lunch', 'Dinner',
+    'Quick', 'Healthy', 'Comfort food', 'Gluten free', 'Spicy', 'Snack',
+)
+INGREDIENT_NAMES = (
+    'Salt', 'Pepper', 'Garlic', 'Onion', 'Tomato', 'Chicken', 'Rice',
+    'Flour', 'Butter', 'Egg', 'Milk', 'Cheese', 'Basil', 'Ginger',
+    'Lemon', 'Potato', 'Carrot', 'Beef', 'Prawns', 'Cinnamon',
+)
+
+
+class Command(BaseCommand):
+    """Django command to fill the database with production sized data"""
+    help = 'Generate users with recipes, tags and ingredients in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--recipes-per-user', type=int, default=20)
+        parser.add_argument('--tags-per-user', type=int, default=10)
+        parser.add_argument('--ingredients-per-user', type=int, default=30)
+        parser.add_argument('--tags-per-recipe', type=int, default=2)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=6)
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Random seed, the same seed always generates the same data'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows per INSERT statement'
+        )
+        parser.add_argument(
+            '--users-per-transaction', type=int, default=100,
+            help='Users generated (and committed) together'
+        )
+        parser.add_argument('--email-prefix', default='seed')
+        parser.add_argument('--password', default='password123')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('--users must be a positive number')
+        if options['tags_per_recipe'] > options['tags_per_user']:
+            raise CommandError('--tags-per-recipe exceeds --tags-per-user')
+        if options['ingredients_per_recipe'] > \
+                options['ingredients_per_user']:
+            raise CommandError(
+                '--ingredients-per-recipe exceeds --ingredients-per-user'
+            )
+
+        emails = [
+            f"{options['email_prefix']}{i}@example.com"
+            for i in range(options['users'])
+        ]
+        if get_user_model().objects.filter(email__in=emails[:1]).exists():
+            raise CommandError(
+                'Seed users already exist, use another --email-prefix'
+            )
+
+        rng = random.Random(options['seed'])
+        # Hashing is by far the slowest part of creating a user, so every
+        # seeded user shares one hash of the same password
+        password = make_password(options['password'])
+        totals = {'users': 0, 'recipes': 0, 'tags': 0, 'ingredients': 0}
+        start = time.monotonic()
+
+        step = options['users_per_transaction']
+        for offset in range(0, len(emails), step):
+            with transaction.atomic():
+                counts = self._seed_users(
+                    emails[offset:offset + step], password, rng, options
+                )
+            for key, value in counts.items():
+                totals[key] += value
+            self.stdout.write(
+                f"{totals['users']}/{len(emails)} users seeded..."
+            )
+
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            'Seeded {users} users, {recipes} recipes, {tags} tags and '
+            '{ingredients} ingredients in {elapsed:.1f}s'.format(
+                elapsed=elapsed, **totals
+            )
+        ))
+
+    def _seed_users(self, emails, password, rng, options):
+        """Create one batch of users together with all their data"""
+        batch_size = options['batch_size']
+        users = bulk_create_with_ids(
+            get_user_model(),
+            (
+                get_user_model()(
+                    email=email,
+                    name=email.split('@')[0],
+                    password=password
+                )
+                for email in emails
+            ),
+            batch_size=batch_size
+        )
+
+        tags = bulk_create_with_ids(
+            Tag,
+            (
+                Tag(user=user, name=self._name(TAG_NAMES, i))
+                for user in users
+                for i in range(options['tags_per_user'])
+            ),
+            batch_size=batch_size
+        )
+        ingredients = bulk_create_with_ids(
+            Ingredient,
+            (
+                Ingredient(user=user, name=self._name(INGREDIENT_NAMES, i))
+                for user in users
+                for i in range(options['ingredients_per_user'])
+            ),
+            batch_size=batch_size
+        )
+        recipes = bulk_create_with_ids(
+            Recipe,
+            (
+                Recipe(
+                    user=user,
+                    title=f'{rng.choice(ADJECTIVES)} {rng.choice(DISHES)}',
+                    time_minutes=rng.randint(5, 180),
+                    price=Decimal(rng.randint(100, 5000)) / 100
+                )
+                for user in users
+                for _ in range(options['recipes_per_user'])
+            ),
+            batch_size=batch_size
+        )
+
+        tag_ids = self._ids_by_user(tags)
+        ingredient_ids = self._ids_by_user(ingredients)
+        bulk_insert(
+            Recipe.tags.through,
+            (
+                Recipe.tags.through(recipe_id=recipe.id, tag_id=tag_id)
+                for recipe in recipes
+                for tag_id in rng.sample(
+                    tag_ids.get(recipe.user_id, []),
+                    options['tags_per_recipe']
+                )
+            ),
+            batch_size=batch_size
+        )
+        bulk_insert(
+            Recipe.ingredients.through,
+            (
+                Recipe.ingredients.through(
+                    recipe_id=recipe.id,
+                    ingredient_id=ingredient_id
+                )
+                for recipe in recipes
+                for ingredient_id in rng.sample(
+                    ingredient_ids.get(recipe.user_id, []),
+                    options['ingredients_per_recipe']
+                )
+            ),
+            batch_size=batch_size
+        )
+        # bulk inserts skip the signals that maintain the summaries. The
+        # change log is left out, no app synced these new users yet
+        user_ids = [user.id for user in users]
+        rebuild_recipe_stats(user_ids)
+        rebuild_recipe_counts(user_ids)
+
+        return {
+            'users': len(users),
+            'recipes': len(recipes),
+            'tags': len(tags),
+            'ingredients': len(ingredients),
+        }
+
+    def _name(self, names, index):
+        """Return a unique name for the index-th item of a user"""
+        name = names[index % len(names)]
+        if index >= len(names):
+            name = f'{name} {index // len(names) + 1}'
+        return name
+
+    def _ids_by_user(self, objs):
+        """Group the ids of user owned objects by their user id"""
+        ids = {}
+        for obj in objs:
+            ids.setdefault(obj.user_id, []).append(obj.id)
+        return ids
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.media import sweep_orphaned_media
+
+
+class Command(BaseCommand):
+    """Django command to remove the recipe images nothing points to"""
+    help = (
+        'Remove the files under the recipe image directory that no recipe '
+        'points to anymore and are older than the grace period'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-period', type=int,
+            default=settings.MEDIA_SWEEP_GRACE_PERIOD,
+            help='Seconds a file is kept after it was written'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Files checked against the recipes per query'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report the orphaned files'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['grace_period'] < 0:
+            raise CommandError(
+                '--batch-size must be positive, --grace-period not negative'
+            )
+        result = sweep_orphaned_media(
+            grace_period=options['grace_period'],
+            dry_run=options['dry_run'],
+            batch_size=options['batch_size']
+        )
+
+        action = 'Found' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {result["orphaned"]} orphaned files '
+            f'({result["bytes"]} bytes) out of {result["scanned"]}'
+        ))
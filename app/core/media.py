@@ -0,0 +1,89 @@
+import logging
+import os
+import threading
+import time
+from itertools import islice
+
+from django.conf import settings
+
+from core.models import Recipe, RECIPE_IMAGE_DIR
+from core.tasks import run_in_background
+
+
+logger = logging.getLogger(__name__)
+
+
+def iter_media_files(directory):
+    """Yield the (name relative to MEDIA_ROOT, mtime) of the files of a
+       media directory, streaming it instead of listing it all at once
+    """
+    path = os.path.join(settings.MEDIA_ROOT, directory)
+    try:
+        entries = os.scandir(path)
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False):
+                yield (
+                    f'{directory.rstrip("/")}/{entry.name}',
+                    entry.stat(follow_symlinks=False).st_mtime
+                )
+
+
+def sweep_orphaned_media(grace_period=None, dry_run=False, batch_size=1000):
+    """Remove the recipe images no recipe points to anymore.
+
+    Files younger than grace_period seconds are kept, an upload writes
+    its file before the recipe row points to it. The directory is read and
+    checked against Recipe.image batch_size files at a time. Returns how
+    many files were scanned and how many (and bytes) were orphaned
+    """
+    if grace_period is None:
+        grace_period = settings.MEDIA_SWEEP_GRACE_PERIOD
+    storage = Recipe._meta.get_field('image').storage
+    cutoff = time.time() - grace_period
+    result = {'scanned': 0, 'orphaned': 0, 'bytes': 0}
+
+    files = iter_media_files(RECIPE_IMAGE_DIR)
+    while True:
+        batch = list(islice(files, batch_size))
+        if not batch:
+            return result
+        result['scanned'] += len(batch)
+        old = [name for name, mtime in batch if mtime < cutoff]
+        referenced = set(
+            Recipe.objects.filter(image__in=old)
+            .values_list('image', flat=True)
+        )
+        for name in old:
+            if name in referenced:
+                continue
+            try:
+                size = storage.size(name)
+                if not dry_run:
+                    storage.delete(name)
+            except OSError:
+                logger.warning('Could not remove %s', name, exc_info=True)
+                continue
+            result['orphaned'] += 1
+            result['bytes'] += size
+
+
+_last_sweep = None
+_sweep_lock = threading.Lock()
+
+
+def schedule_media_sweep():
+    """Sweep the orphaned media in the background, unless this process
+       already did in the last MEDIA_SWEEP_INTERVAL seconds
+    """
+    global _last_sweep
+    now = time.monotonic()
+    with _sweep_lock:
+        if _last_sweep is not None and \
+                now - _last_sweep < settings.MEDIA_SWEEP_INTERVAL:
+            return False
+        _last_sweep = now
+    run_in_background(sweep_orphaned_media)
+    return True
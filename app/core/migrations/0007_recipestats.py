@@ -0,0 +1,42 @@
+# Generated by Django 2.1.15 on 2026-10-19 08:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+
+
+def populate_recipe_stats(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    RecipeStats = apps.get_model('core', 'RecipeStats')
+    totals = Recipe.objects.order_by().values('user_id').annotate(
+        recipe_count=Count('id'),
+        total_time_minutes=Sum('time_minutes'),
+        total_price=Sum('price')
+    )
+    RecipeStats.objects.bulk_create(
+        (RecipeStats(**row) for row in totals.iterator()),
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recipe_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('recipe_count', models.PositiveIntegerField(default=0)),
+                ('total_time_minutes', models.BigIntegerField(default=0)),
+                ('total_price', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+            ],
+        ),
+        migrations.RunPython(
+            populate_recipe_stats, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 2.1.15 on 2026-10-19 08:44
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_recipe_counts(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field in (('Tag', 'tag_id'),
+                              ('Ingredient', 'ingredient_id')):
+        through = getattr(Recipe, f'{model_name.lower()}s').through
+        apps.get_model('core', model_name).objects.update(
+            recipe_count=Coalesce(Subquery(
+                through.objects.filter(**{field: OuterRef('pk')})
+                .order_by()
+                .values(field)
+                .annotate(count=Count('*'))
+                .values('count')
+            ), 0)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipestats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', 'recipe_count'], name='core_ingred_user_id_de1121_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'recipe_count'], name='core_tag_user_id_699afc_idx'),
+        ),
+        migrations.RunPython(
+            populate_recipe_counts, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 2.1.15 on 2026-10-19 08:45
+
+import core.models
+from django.db import migrations
+from django.db.models.functions import Lower, Trim
+
+
+# Prefix lookups run as name_normalized LIKE 'prefix%', which needs the
+# pattern operator class to use a btree index on Postgres
+PREFIX_INDEXES = (
+    ('core_tag_user_name_normalized_like', 'core_tag'),
+    ('core_ingredient_user_name_normalized_like', 'core_ingredient'),
+)
+
+
+def populate_name_normalized(apps, schema_editor):
+    for model_name in ('Tag', 'Ingredient'):
+        apps.get_model('core', model_name).objects.update(
+            name_normalized=Lower(Trim('name'))
+        )
+
+
+def create_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table in PREFIX_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} '
+            f'(user_id, name_normalized varchar_pattern_ops)'
+        )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in PREFIX_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='name_normalized',
+            field=core.models.NormalizedNameField(default='', editable=False, max_length=255, source='name'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='name_normalized',
+            field=core.models.NormalizedNameField(default='', editable=False, max_length=255, source='name'),
+        ),
+        migrations.RunPython(
+            populate_name_normalized, migrations.RunPython.noop
+        ),
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 2.1.15 on 2026-10-19 09:00
+
+from django.db import migrations
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Merge the tags (and ingredients) a user has more than once into the
+       oldest of them, moving their recipe links over
+    """
+    Recipe = apps.get_model('core', 'Recipe')
+    ChangeLogEntry = apps.get_model('core', 'ChangeLogEntry')
+    for model_name in ('Tag', 'Ingredient'):
+        model = apps.get_model('core', model_name)
+        object_type = model_name.lower()
+        through = getattr(Recipe, f'{object_type}s').through
+        field = f'{object_type}_id'
+        groups = model.objects.values('user_id', 'name').annotate(
+            keep=Min('id'), copies=Count('id')
+        ).filter(copies__gt=1).order_by()
+        kept = []
+        for group in groups.iterator():
+            user_id, keep = group['user_id'], group['keep']
+            duplicates = list(model.objects.filter(
+                user_id=user_id, name=group['name']
+            ).exclude(id=keep).values_list('id', flat=True))
+            links = through.objects.filter(**{f'{field}__in': duplicates})
+            recipe_ids = set(links.values_list('recipe_id', flat=True))
+            linked = set(through.objects.filter(
+                **{field: keep}
+            ).values_list('recipe_id', flat=True))
+            links.delete()
+            through.objects.bulk_create([
+                through(**{'recipe_id': recipe_id, field: keep})
+                for recipe_id in sorted(recipe_ids - linked)
+            ])
+            model.objects.filter(id__in=duplicates).delete()
+            kept.append(keep)
+            # the apps syncing the user drop the duplicates
+            ChangeLogEntry.objects.bulk_create([
+                ChangeLogEntry(
+                    user_id=user_id, object_type=object_type,
+                    object_id=pk, deleted=True
+                )
+                for pk in duplicates
+            ] + [
+                ChangeLogEntry(
+                    user_id=user_id, object_type='recipe',
+                    object_id=recipe_id
+                )
+                for recipe_id in sorted(recipe_ids)
+            ])
+
+        model.objects.filter(id__in=kept).update(
+            recipe_count=Coalesce(Subquery(
+                through.objects.filter(**{field: OuterRef('pk')})
+                .order_by()
+                .values(field)
+                .annotate(count=Count('*'))
+                .values('count')
+            ), 0)
+        )
+
+    if schema_editor.connection.vendor == 'postgresql':
+        # The foreign keys are deferred, the deletes above leave their
+        # checks pending and Postgres refuses to ALTER a table with pending
+        # trigger events in the same transaction. Run the checks now
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_changelogentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_names, migrations.RunPython.noop
+        ),
+        migrations.AlterUniqueTogether(
+            name='ingredient',
+            unique_together={('user', 'name')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='tag',
+            unique_together={('user', 'name')},
+        ),
+    ]
@@ -6,6 +6,10 @@ from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
 from django.conf import settings
 
 
+# where the recipe images are uploaded, relative to MEDIA_ROOT
+RECIPE_IMAGE_DIR = 'uploads/recipe/'
+
+
 def recipe_image_file_path(instance, filename):
     """Generate file path for new recipe image"""
     # we separate the string in a list depending on the dot positioning
@@ -15,7 +19,34 @@ def recipe_image_file_path(instance, filename):
     filename = f'{uuid.uuid4()}.{extension}'
 
     # helper funtions that make a valid url by joining two strings
-    return os.path.join('uploads/recipe/', filename)
+    return os.path.join(RECIPE_IMAGE_DIR, filename)
+
+
+def normalize_name(name):
+    """Return the form of a name used for case insensitive prefix lookups"""
+    return (name or '').strip().lower()[:255]
+
+
+class NormalizedNameField(models.CharField):
+    """Read only copy of another field in its normalized form, refreshed
+       on every save (bulk_create included)
+    """
+
+    def __init__(self, *args, source='name', **kwargs):
+        self.source = source
+        kwargs.setdefault('max_length', 255)
+        kwargs.setdefault('editable', False)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['source'] = self.source
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = normalize_name(getattr(model_instance, self.source))
+        setattr(model_instance, self.attname, value)
+        return value
 
 
 class UserManager(BaseUserManager):
@@ -48,6 +79,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # set when the user asked to be deleted, the account is inactive from
+    # then on and core.deletion purges its data in the background
+    deletion_requested_at = models.DateTimeField(null=True, blank=True)
 
     # We assign UserManager class to objects attr
     objects = UserManager()
@@ -63,6 +97,17 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    # number of recipes using the tag, kept up to date by core.signals
+    recipe_count = models.IntegerField(default=0)
+    # lowercased name for prefix searches
+    name_normalized = NormalizedNameField(default='')
+
+    class Meta:
+        # a user has a single tag or ingredient with a name
+        unique_together = ('user', 'name')
+        indexes = [
+            models.Index(fields=['user', 'recipe_count']),
+        ]
 
     def __str__(self):
         return self.name
@@ -75,6 +120,17 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    # number of recipes using the ingredient, kept up to date by core.signals
+    recipe_count = models.IntegerField(default=0)
+    # lowercased name for prefix searches
+    name_normalized = NormalizedNameField(default='')
+
+    class Meta:
+        # a user has a single tag or ingredient with a name
+        unique_together = ('user', 'name')
+        indexes = [
+            models.Index(fields=['user', 'recipe_count']),
+        ]
 
     def __str__(self):
         return self.name
@@ -103,5 +159,93 @@ class Recipe(models.Model):
     # will call it behind scene
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
 
+    class Meta:
+        # the recipe lists filter and sort by these within a user, id
+        # keeps the order stable and lets both directions scan the index
+        indexes = [
+            models.Index(fields=['user', 'price', 'id']),
+            models.Index(fields=['user', 'time_minutes', 'id']),
+        ]
+
     def __str__(self):
         return self.title
+
+
+class RecipeStats(models.Model):
+    """Running totals of the recipes of a user, updated on every recipe
+       write so the statistics never need to scan the recipes
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='recipe_stats'
+    )
+    recipe_count = models.PositiveIntegerField(default=0)
+    total_time_minutes = models.BigIntegerField(default=0)
+    total_price = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=0
+    )
+
+    def __str__(self):
+        return f'{self.user} ({self.recipe_count} recipes)'
+
+
+class IdempotencyKey(models.Model):
+    """First response to a POST sent with an Idempotency-Key header,
+       replayed to the retries of the same request
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    key = models.CharField(max_length=255)
+    # hash of the method, path and payload the key was first used with
+    request_fingerprint = models.CharField(max_length=64)
+    # null while the first request is still running
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response_body = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        unique_together = ('user', 'key')
+
+    def __str__(self):
+        return self.key
+
+
+class ChangeLogEntry(models.Model):
+    """A recipe, tag or ingredient of a user was written or deleted. The
+       ids are the cursors the apps sync their collections from
+    """
+    RECIPE = 'recipe'
+    TAG = 'tag'
+    INGREDIENT = 'ingredient'
+    OBJECT_TYPES = (
+        (RECIPE, 'Recipe'),
+        (TAG, 'Tag'),
+        (INGREDIENT, 'Ingredient'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        db_index=False
+    )
+    object_type = models.CharField(max_length=20, choices=OBJECT_TYPES)
+    object_id = models.IntegerField()
+    # tombstone of a deleted object
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        # the changes of a user after a cursor
+        indexes = [
+            models.Index(fields=['user', 'id']),
+        ]
+
+    def __str__(self):
+        return f'{self.object_type} {self.object_id}'
@@ -0,0 +1,129 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+
+def table_estimate(queryset):
+    """Return the number of rows Postgres estimates the table of an
+       unfiltered queryset has, None when there is no estimate available
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql' or queryset.query.where:
+        return None
+    with connection.cursor() as cursor:
+        # reltuples is kept up to date by VACUUM/ANALYZE, reading it is
+        # instant compared to a COUNT(*) over millions of rows
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    if not row or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def planner_estimate(queryset):
+    """Return the number of rows the Postgres planner expects a filtered
+       queryset to return, None when there is no estimate available
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    try:
+        sql, params = queryset.order_by().query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    # QuerySet.explain() joins the columns of the plan rows with str(),
+    # which turns the JSON plan psycopg2 already decoded into a repr
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def estimated_count(queryset, threshold=None):
+    """Count the rows of a queryset, trusting the Postgres estimates once
+       they are above the threshold. Return the count and whether it is
+       an estimate
+    """
+    if threshold is None:
+        threshold = settings.ESTIMATED_COUNT_THRESHOLD
+    if threshold is not None:
+        estimate = table_estimate(queryset)
+        if estimate is None:
+            estimate = planner_estimate(queryset)
+        if estimate is not None and estimate >= threshold:
+            return estimate, True
+
+    return queryset.count(), False
+
+
+class LookaheadPage(Page):
+    """Page that knows whether a next one exists from the row fetched past
+       its end, not from the count of the paginator
+    """
+
+    def __init__(self, object_list, number, paginator, has_more):
+        super().__init__(object_list, number, paginator)
+        self.has_more = has_more
+
+    def has_next(self):
+        return self.has_more
+
+    def end_index(self):
+        return self.start_index() + len(self) - 1 if len(self) else 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that trusts the Postgres estimates for big results.
+
+    The count, estimated or kept by a counter, can be off either way, so it
+    is only reported: pages are cut by fetching one row past their end
+    """
+    is_estimate = False
+
+    def __init__(self, *args, known_count=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.known_count = known_count
+
+    @cached_property
+    def count(self):
+        if self.known_count is not None:
+            return self.known_count
+        count, self.is_estimate = estimated_count(self.object_list)
+        return count
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # pages past the count may still have rows, page() finds out
+            if int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page + self.orphans
+        rows = list(self.object_list[bottom:top + 1])
+        has_more = len(rows) > top - bottom
+        if has_more:
+            rows = rows[:self.per_page]
+        elif not rows and (number > 1 or not self.allow_empty_first_page):
+            raise EmptyPage(_('That page contains no results'))
+        # never report fewer rows than the ones seen, that would also hide
+        # the links to the pages past the count in the admin
+        seen = bottom + len(rows) + (1 if has_more else 0)
+        if seen > self.count:
+            self.count = seen
+            self.__dict__.pop('num_pages', None)
+        return LookaheadPage(rows, number, self, has_more)
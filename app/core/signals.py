@@ -0,0 +1,182 @@
+from decimal import Decimal
+
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from core.changelog import log_changes
+from core.media import schedule_media_sweep
+from core.models import Tag, Ingredient, Recipe
+from core.stats import adjust_recipe_counts, adjust_recipe_stats
+
+
+# through table of the recipe relations -> (counted model, its through fk)
+COUNTED_RELATIONS = {
+    Recipe.tags.through: (Tag, 'tag_id'),
+    Recipe.ingredients.through: (Ingredient, 'ingredient_id'),
+}
+
+
+def _totals(recipe):
+    """Return the values of a recipe that add up to the user totals"""
+    # price may still be the float the recipe was created with
+    return int(recipe.time_minutes), Decimal(str(recipe.price))
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_recipe_totals(sender, instance, raw, **kwargs):
+    """Keep the values a recipe had before it is updated"""
+    instance._previous_totals = None
+    if instance.pk and not instance._state.adding and not raw:
+        instance._previous_totals = Recipe.objects.filter(
+            pk=instance.pk
+        ).values_list('user_id', 'time_minutes', 'price').first()
+
+
+@receiver(post_save, sender=Recipe)
+def update_stats_on_save(sender, instance, created, raw, **kwargs):
+    """Move the totals of the owner by what the recipe changed"""
+    if raw:
+        return
+    time_minutes, price = _totals(instance)
+    previous = getattr(instance, '_previous_totals', None)
+    if previous is None:
+        if created:
+            adjust_recipe_stats(instance.user_id, 1, time_minutes, price)
+        return
+
+    user_id, previous_time_minutes, previous_price = previous
+    if user_id != instance.user_id:
+        # the recipe moved to another user
+        adjust_recipe_stats(user_id, -1, -previous_time_minutes,
+                            -previous_price)
+        adjust_recipe_stats(instance.user_id, 1, time_minutes, price)
+    elif (time_minutes, price) != (previous_time_minutes, previous_price):
+        adjust_recipe_stats(
+            user_id, 0,
+            time_minutes - previous_time_minutes,
+            price - previous_price
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def update_stats_on_delete(sender, instance, **kwargs):
+    """Take a deleted recipe out of the totals of its owner"""
+    time_minutes, price = _totals(instance)
+    # Without totals there is nothing to take the recipe out of. That is
+    # also the case when the recipe goes away with its user
+    adjust_recipe_stats(
+        instance.user_id, -1, -time_minutes, -price, create=False
+    )
+
+
+def _linked_ids(through, field, instance, reverse, pk_set):
+    """Return which of pk_set are linked right now to the instance, all of
+       the linked ids when pk_set is None
+    """
+    source, target = ('recipe_id', field) if not reverse else \
+        (field, 'recipe_id')
+    links = through.objects.filter(**{source: instance.pk})
+    if pk_set is not None:
+        links = links.filter(**{f'{target}__in': pk_set})
+    return set(links.values_list(target, flat=True))
+
+
+@receiver(m2m_changed)
+def update_recipe_counts(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    """Keep recipe_count of tags and ingredients in step with the links"""
+    if sender not in COUNTED_RELATIONS:
+        return
+    model, field = COUNTED_RELATIONS[sender]
+    if action in ('pre_remove', 'pre_clear'):
+        # Django reports every id given to remove(), linked or not
+        instance._unlinked_ids = _linked_ids(
+            sender, field, instance, reverse, pk_set
+        )
+        return
+    if action == 'post_add':
+        changed, delta = pk_set, 1
+    elif action in ('post_remove', 'post_clear'):
+        changed, delta = getattr(instance, '_unlinked_ids', set()), -1
+    else:
+        return
+
+    if not reverse:
+        adjust_recipe_counts(model, changed, delta)
+    elif changed:
+        # a tag or ingredient got linked to (or unlinked from) recipes
+        adjust_recipe_counts(model, [instance.pk], delta * len(changed))
+
+
+@receiver(pre_delete, sender=Recipe)
+def update_recipe_counts_on_delete(sender, instance, **kwargs):
+    """Take a recipe about to be deleted out of its tags and ingredients"""
+    for through, (model, field) in COUNTED_RELATIONS.items():
+        model.objects.filter(
+            pk__in=through.objects.filter(
+                recipe_id=instance.pk
+            ).values(field)
+        ).update(recipe_count=F('recipe_count') - 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def sweep_media_on_delete(sender, instance, **kwargs):
+    """The image of a deleted recipe is left behind for the sweeper"""
+    if instance.image:
+        schedule_media_sweep()
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def log_save(sender, instance, raw, **kwargs):
+    """Log a written recipe, tag or ingredient for the apps to sync"""
+    if raw:
+        return
+    log_changes(sender, [(instance.user_id, instance.pk)])
+    previous = getattr(instance, '_previous_totals', None)
+    if previous and previous[0] != instance.user_id:
+        # the recipe moved, for its previous user it is gone
+        log_changes(sender, [(previous[0], instance.pk)], deleted=True)
+
+
+@receiver(pre_delete, sender=Recipe)
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def log_delete(sender, instance, **kwargs):
+    """Log the tombstone of a recipe, tag or ingredient.
+
+    Logged before the delete: when the user itself is deleted, the log
+    entries of the user are deleted after the pre_delete signals
+    """
+    log_changes(sender, [(instance.user_id, instance.pk)], deleted=True)
+    if sender is not Recipe:
+        # the recipes using it lose a link without m2m_changed
+        through, (_, field) = next(
+            (through, relation) for through, relation in
+            COUNTED_RELATIONS.items() if relation[0] is sender
+        )
+        log_changes(Recipe, through.objects.filter(
+            **{field: instance.pk}
+        ).values_list('recipe__user_id', 'recipe_id'))
+
+
+@receiver(m2m_changed)
+def log_links(sender, instance, action, reverse, pk_set, **kwargs):
+    """Log the recipes whose tags or ingredients changed"""
+    if sender not in COUNTED_RELATIONS or not action.startswith('post_'):
+        return
+    if not reverse:
+        log_changes(Recipe, [(instance.user_id, instance.pk)])
+        return
+    if action == 'post_add':
+        recipe_ids = pk_set
+    else:
+        recipe_ids = getattr(instance, '_unlinked_ids', None)
+    if recipe_ids:
+        log_changes(Recipe, Recipe.objects.filter(
+            id__in=recipe_ids
+        ).values_list('user_id', 'id'))
@@ -0,0 +1,73 @@
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from core.models import Tag, Ingredient, Recipe, RecipeStats
+
+
+def adjust_recipe_stats(user_id, count, time_minutes, price, create=True):
+    """Add the given deltas to the recipe totals of a user"""
+    updated = RecipeStats.objects.filter(user_id=user_id).update(
+        recipe_count=F('recipe_count') + count,
+        total_time_minutes=F('total_time_minutes') + time_minutes,
+        total_price=F('total_price') + price
+    )
+    # The first write of a user has no totals to add to yet
+    if not updated and create:
+        rebuild_recipe_stats([user_id])
+
+
+def rebuild_recipe_stats(user_ids):
+    """Recompute from the recipes table the totals of the given users"""
+    user_ids = set(user_ids)
+    totals = {
+        row['user_id']: row for row in
+        Recipe.objects.filter(user_id__in=user_ids)
+        .order_by()
+        .values('user_id')
+        .annotate(
+            recipe_count=Count('id'),
+            total_time_minutes=Sum('time_minutes'),
+            total_price=Sum('price')
+        )
+    }
+    for user_id in user_ids:
+        row = totals.get(user_id, {})
+        RecipeStats.objects.update_or_create(user_id=user_id, defaults={
+            'recipe_count': row.get('recipe_count') or 0,
+            'total_time_minutes': row.get('total_time_minutes') or 0,
+            'total_price': row.get('total_price') or 0,
+        })
+
+
+def adjust_recipe_counts(model, ids, delta):
+    """Add delta to the recipe_count of the tags or ingredients given"""
+    if ids:
+        model.objects.filter(pk__in=ids).update(
+            recipe_count=F('recipe_count') + delta
+        )
+
+
+def count_subquery(through, field):
+    """Subquery counting the through rows of the outer tag or ingredient"""
+    return Coalesce(Subquery(
+        through.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(count=Count('*'))
+        .values('count')
+    ), 0)
+
+
+def rebuild_recipe_counts(user_ids=None):
+    """Recompute from the through tables the recipe_count of the tags and
+       ingredients of the given users (of everybody when None)
+    """
+    relations = (
+        (Tag, Recipe.tags.through, 'tag_id'),
+        (Ingredient, Recipe.ingredients.through, 'ingredient_id'),
+    )
+    for model, through, field in relations:
+        queryset = model.objects.all()
+        if user_ids is not None:
+            queryset = queryset.filter(user_id__in=set(user_ids))
+        queryset.update(recipe_count=count_subquery(through, field))
@@ -0,0 +1,56 @@
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import connections, transaction
+
+
+logger = logging.getLogger(__name__)
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _work():
+    """Run the queued tasks one after the other, forever"""
+    while True:
+        func, args, kwargs = _queue.get()
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            logger.exception('Background task %s failed', func.__name__)
+        finally:
+            # the worker thread has its own database connections
+            connections.close_all()
+            _queue.task_done()
+
+
+def _start_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=_work, name='background-tasks', daemon=True
+            )
+            _worker.start()
+
+
+def run_in_background(func, *args, **kwargs):
+    """Run func in a worker thread of this process once the current
+       transaction commits, so it sees what the request wrote.
+
+    Tasks don't survive a restart, they must be idempotent and have a
+    management command catching up with whatever was left undone. With
+    BACKGROUND_TASKS_EAGER (in tests) they run straight away instead
+    """
+    if settings.BACKGROUND_TASKS_EAGER:
+        func(*args, **kwargs)
+        return
+
+    def enqueue():
+        _start_worker()
+        _queue.put((func, args, kwargs))
+
+    transaction.on_commit(enqueue)
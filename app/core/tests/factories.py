@@ -0,0 +1,75 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+
+from core.bulk import bulk_create_with_ids
+from core.models import Tag, Ingredient, Recipe
+
+
+def create_user(email='test@correo.com', password='testpass', **params):
+    """Create and return a user"""
+    return get_user_model().objects.create_user(email, password, **params)
+
+
+def create_users(count, password='testpass', **params):
+    """Create count users at once, all of them sharing the same password"""
+    password = make_password(password)
+    return bulk_create_with_ids(get_user_model(), (
+        get_user_model()(
+            email=f'user{i}@correo.com',
+            password=password,
+            **params
+        )
+        for i in range(count)
+    ))
+
+
+def sample_tag(user, name='Main course'):
+    """Create and return a sample tag"""
+    return Tag.objects.create(user=user, name=name)
+
+
+def sample_ingredient(user, name='Cinnamon'):
+    """Create and return a sample ingredient"""
+    return Ingredient.objects.create(user=user, name=name)
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    # Adds or/and updates defaults dict with
+    # whatever attr we pass through the function
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def create_tags(user, names):
+    """Create a tag for every name with a single query"""
+    return bulk_create_with_ids(
+        Tag, (Tag(user=user, name=name) for name in names)
+    )
+
+
+def create_ingredients(user, names):
+    """Create an ingredient for every name with a single query"""
+    return bulk_create_with_ids(
+        Ingredient, (Ingredient(user=user, name=name) for name in names)
+    )
+
+
+def create_recipes(user, count, **params):
+    """Create count sample recipes with a single query"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    return bulk_create_with_ids(
+        Recipe, (Recipe(user=user, **defaults) for _ in range(count))
+    )
@@ -1,7 +1,15 @@
-from django.test import TestCase, Client
+from unittest.mock import patch
+
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
+from core.models import Recipe
+from core.pagination import EstimatedCountPaginator
+from core.tests.factories import (
+    create_recipes, create_tags, sample_recipe, sample_tag
+)
+
 
 class AdminSiteTests(TestCase):
 
@@ -42,3 +50,82 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+    def test_recipe_attr_changelists(self):
+        """Test the tag, ingredient and recipe lists work"""
+        sample_tag(user=self.user, name='Vegan')
+        create_recipes(self.user, 3, title='Bulk recipe')
+
+        for url_name in ('tag', 'ingredient', 'recipe'):
+            url = reverse(f'admin:core_{url_name}_changelist')
+            res = self.client.get(url, {'q': 'V'})
+
+            self.assertEqual(res.status_code, 200)
+        res = self.client.get(reverse('admin:core_recipe_changelist'))
+        self.assertContains(res, 'Bulk recipe', count=3)
+
+    def test_recipe_change_page_renders_selected_tags_only(self):
+        """Test the recipe form doesn't list every tag as an option"""
+        recipe = sample_recipe(user=self.user)
+        tag = sample_tag(user=self.user, name='Selected tag')
+        recipe.tags.add(tag)
+        create_tags(self.user, ['Unrelated tag'])
+
+        url = reverse('admin:core_recipe_change', args=[recipe.id])
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, 'Selected tag')
+        self.assertNotContains(res, 'Unrelated tag')
+
+    def test_tag_autocomplete(self):
+        """Test tags can be searched by prefix from the recipe form"""
+        create_tags(self.user, ['Vegan', 'Vegetarian', 'Dessert'])
+
+        url = reverse('admin:core_tag_autocomplete')
+        res = self.client.get(url, {'term': 'veg'})
+
+        self.assertEqual(res.status_code, 200)
+        names = {result['text'] for result in res.json()['results']}
+        self.assertEqual(names, {'Vegan', 'Vegetarian'})
+
+    @override_settings(ESTIMATED_COUNT_THRESHOLD=0)
+    @patch('core.pagination.table_estimate', return_value=None)
+    @patch('core.pagination.planner_estimate', return_value=None)
+    def test_paginator_exact_count_without_estimate(self, *mocks):
+        """Test the paginator counts rows when there's no estimate"""
+        create_recipes(self.user, 3)
+
+        paginator = EstimatedCountPaginator(Recipe.objects.order_by('id'), 2)
+
+        self.assertEqual(paginator.count, 3)
+        self.assertEqual(paginator.num_pages, 2)
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_delete_user_purges_in_background(self):
+        """Test that deleting a user from the admin goes through the
+           background purge
+        """
+        sample_recipe(user=self.user)
+        url = reverse('admin:core_user_delete', args=[self.user.id])
+
+        res = self.client.get(url)
+        self.assertContains(res, self.user.email)
+        res = self.client.post(url, {'post': 'yes'})
+
+        self.assertEqual(res.status_code, 302)
+        self.assertFalse(
+            get_user_model().objects.filter(pk=self.user.pk).exists()
+        )
+        self.assertFalse(Recipe.objects.exists())
+
+    @override_settings(BACKGROUND_TASKS_EAGER=False)
+    def test_delete_user_deactivates_straight_away(self):
+        """Test that the user can't log in while waiting to be purged"""
+        url = reverse('admin:core_user_delete', args=[self.user.id])
+
+        self.client.post(url, {'post': 'yes'})
+
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertIsNotNone(self.user.deletion_requested_at)
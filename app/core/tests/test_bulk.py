@@ -0,0 +1,51 @@
+from django.db.models.signals import m2m_changed
+from django.test import TestCase
+
+from core.bulk import sync_m2m
+from core.models import Recipe
+from core.tests.factories import create_user, create_tags, sample_recipe
+
+
+class SyncM2MTests(TestCase):
+    """Test applying the difference of many to many links"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.recipe = sample_recipe(user=self.user)
+        self.tags = create_tags(
+            self.user, ['Vegan', 'Dessert', 'Lunch', 'Dinner']
+        )
+        self.recipe.tags.add(*self.tags[:2])
+        self.actions = []
+        m2m_changed.connect(self.record, sender=Recipe.tags.through)
+        self.addCleanup(
+            m2m_changed.disconnect, self.record, sender=Recipe.tags.through
+        )
+
+    def record(self, action, pk_set, **kwargs):
+        self.actions.append((action, pk_set))
+
+    def test_applies_difference(self):
+        """Test that only the changed links are removed and added"""
+        tag1, tag2, tag3, _ = self.tags
+
+        added, removed = sync_m2m(self.recipe, 'tags', [tag2.id, tag3.id])
+
+        self.assertEqual((added, removed), ({tag3.id}, {tag1.id}))
+        self.assertEqual(set(self.recipe.tags.all()), {tag2, tag3})
+        self.assertEqual([action for action, _ in self.actions], [
+            'pre_remove', 'post_remove', 'pre_add', 'post_add'
+        ])
+        tag1.refresh_from_db()
+        tag3.refresh_from_db()
+        self.assertEqual((tag1.recipe_count, tag3.recipe_count), (0, 1))
+
+    def test_nothing_changed(self):
+        """Test that matching links are left alone"""
+        with self.assertNumQueries(1):
+            added, removed = sync_m2m(
+                self.recipe, 'tags', [tag.id for tag in self.tags[:2]]
+            )
+
+        self.assertEqual((added, removed), (set(), set()))
+        self.assertEqual(self.actions, [])
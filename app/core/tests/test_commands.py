@@ -1,9 +1,21 @@
 from unittest.mock import patch
 
+import json
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import F, Sum
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core.models import (
+    Tag, Ingredient, Recipe, RecipeStats, ChangeLogEntry
+)
+
 
 class CommandTests(TestCase):
 
@@ -27,3 +39,283 @@ class CommandTests(TestCase):
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command('wait_for_db')
             self.assertEqual(gi.call_count, 6)
+
+
+class SeedDataCommandTests(TestCase):
+
+    def seed(self, **options):
+        """Run seed_data with small defaults and return its output"""
+        defaults = {
+            'users': 3,
+            'recipes_per_user': 4,
+            'tags_per_user': 3,
+            'ingredients_per_user': 5,
+            'tags_per_recipe': 2,
+            'ingredients_per_recipe': 3,
+            'users_per_transaction': 2,
+            'stdout': StringIO(),
+        }
+        defaults.update(options)
+        call_command('seed_data', **defaults)
+
+    def test_seed_data_creates_rows(self):
+        """Test seeding creates the requested amount of rows"""
+        self.seed()
+
+        self.assertEqual(get_user_model().objects.count(), 3)
+        self.assertEqual(Tag.objects.count(), 9)
+        self.assertEqual(Ingredient.objects.count(), 15)
+        self.assertEqual(Recipe.objects.count(), 12)
+        self.assertEqual(Recipe.tags.through.objects.count(), 24)
+        self.assertEqual(Recipe.ingredients.through.objects.count(), 36)
+        # the maintained counters are rebuilt after the bulk inserts
+        self.assertEqual(
+            Tag.objects.aggregate(total=Sum('recipe_count'))['total'], 24
+        )
+        self.assertEqual(
+            sum(RecipeStats.objects.values_list('recipe_count', flat=True)),
+            12
+        )
+        # recipes are only linked to tags of their own user
+        self.assertFalse(
+            Recipe.tags.through.objects.exclude(
+                tag__user=F('recipe__user')
+            ).exists()
+        )
+
+    def test_seed_data_is_deterministic(self):
+        """Test the same seed generates the same data"""
+        self.seed(seed=7, email_prefix='first')
+        self.seed(seed=7, email_prefix='second')
+
+        def recipes(prefix):
+            return list(
+                Recipe.objects.filter(user__email__startswith=prefix)
+                .order_by('id')
+                .values_list('title', 'time_minutes', 'price')
+            )
+
+        self.assertEqual(recipes('first'), recipes('second'))
+
+    def test_seed_data_existing_users(self):
+        """Test seeding twice with the same prefix fails"""
+        self.seed(users=1)
+
+        with self.assertRaises(CommandError):
+            self.seed(users=1)
+
+
+class ImportRecipesCommandTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@correo.com',
+            'testpass'
+        )
+
+    def import_lines(self, lines, **options):
+        """Write lines to a JSONL file and import it"""
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl') as f:
+            for line in lines:
+                f.write(line if isinstance(line, str) else json.dumps(line))
+                f.write('\n')
+            f.flush()
+            call_command(
+                'import_recipes', f.name,
+                stdout=StringIO(), stderr=StringIO(), **options
+            )
+
+    def test_import_recipes(self):
+        """Test importing recipes with tags and ingredients by name"""
+        existing = Tag.objects.create(user=self.user, name='Vegan')
+        self.import_lines([
+            {
+                'user': 'test@correo.com',
+                'title': 'Tofu curry',
+                'time_minutes': 30,
+                'price': '7.50',
+                'tags': ['Vegan', 'Dinner'],
+                'ingredients': ['Tofu', 'Rice'],
+            },
+            {
+                'user': 'test@correo.com',
+                'title': 'Rice pudding',
+                'time_minutes': 45,
+                'price': 3,
+                'tags': ['Dessert'],
+                'ingredients': ['Rice', 'Milk'],
+            },
+        ], batch_size=1)
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(recipes.count(), 2)
+        self.assertEqual(recipes[0].title, 'Tofu curry')
+        self.assertIn(existing, recipes[0].tags.all())
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+        # both recipes share the same rice ingredient
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user, name='Rice').count(),
+            1
+        )
+        self.assertEqual(recipes[1].ingredients.count(), 2)
+        # the summaries add up the batches
+        self.assertEqual(
+            Ingredient.objects.get(user=self.user, name='Rice').recipe_count,
+            2
+        )
+        existing.refresh_from_db()
+        self.assertEqual(existing.recipe_count, 1)
+        stats = RecipeStats.objects.get(user=self.user)
+        self.assertEqual(stats.recipe_count, 2)
+        self.assertEqual(stats.total_time_minutes, 75)
+        self.assertEqual(stats.total_price, Decimal('10.50'))
+        # the apps syncing the user hear about what was imported
+        logged = set(ChangeLogEntry.objects.filter(
+            user=self.user
+        ).values_list('object_type', 'object_id'))
+        self.assertTrue({('recipe', recipe.id) for recipe in recipes} <=
+                        logged)
+        self.assertIn(
+            ('ingredient', recipes[1].ingredients.get(name='Milk').id),
+            logged
+        )
+
+    def test_import_recipes_default_user(self):
+        """Test lines without user are imported for --user"""
+        self.import_lines(
+            [{'title': 'Toast', 'time_minutes': 2, 'price': 1}],
+            user='test@correo.com'
+        )
+
+        self.assertTrue(
+            Recipe.objects.filter(user=self.user, title='Toast').exists()
+        )
+
+    def test_import_recipes_invalid_lines_skipped(self):
+        """Test invalid lines and unknown users don't stop the import"""
+        self.import_lines([
+            'not json',
+            {'user': 'test@correo.com', 'title': 'No price'},
+            {
+                'user': 'unknown@correo.com',
+                'title': 'Toast',
+                'time_minutes': 2,
+                'price': 1,
+            },
+            {
+                'user': 'test@correo.com',
+                'title': 'Toast',
+                'time_minutes': 2,
+                'price': 1,
+            },
+        ])
+
+        self.assertEqual(Recipe.objects.count(), 1)
+
+
+class ProvisionUsersCommandTests(TestCase):
+
+    def provision(self, content, suffix='.jsonl', **options):
+        """Write content to a file and provision its users"""
+        stdout, stderr = StringIO(), StringIO()
+        with tempfile.NamedTemporaryFile('w', suffix=suffix) as f:
+            f.write(content)
+            f.flush()
+            call_command(
+                'provision_users', f.name,
+                stdout=stdout, stderr=stderr, **options
+            )
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_provision_users_jsonl(self):
+        """Test creating users from JSON lines with parallel hashing"""
+        lines = [
+            {'email': f'user{i}@Partner.com', 'password': f'pass{i}'}
+            for i in range(5)
+        ]
+        lines.append({'email': 'nopass@partner.com', 'name': 'No Pass'})
+        stdout, _ = self.provision(
+            '\n'.join(json.dumps(line) for line in lines),
+            batch_size=2, workers=2
+        )
+
+        users = get_user_model().objects.filter(email__endswith='partner.com')
+        self.assertEqual(users.count(), 6)
+        user = users.get(email='user3@partner.com')
+        self.assertEqual(user.name, 'user3')
+        self.assertTrue(user.check_password('pass3'))
+        self.assertFalse(
+            users.get(email='nopass@partner.com').has_usable_password()
+        )
+        self.assertIn('Created 6 users', stdout)
+
+    def test_provision_users_csv(self):
+        """Test creating users from a CSV file"""
+        self.provision(
+            'email,name,password\n'
+            'chef@correo.com,Chef,secret123\n',
+            suffix='.csv', workers=1
+        )
+
+        user = get_user_model().objects.get(email='chef@correo.com')
+        self.assertEqual(user.name, 'Chef')
+        self.assertTrue(user.check_password('secret123'))
+
+    def test_provision_users_invalid_and_existing_skipped(self):
+        """Test invalid lines and registered emails don't stop the run"""
+        existing = get_user_model().objects.create_user(
+            'taken@correo.com', 'testpass'
+        )
+        _, stderr = self.provision('\n'.join([
+            'not json',
+            json.dumps({'email': 'not an email'}),
+            json.dumps({'email': 'taken@correo.com', 'password': 'other'}),
+            json.dumps({'email': 'new@correo.com'}),
+            json.dumps({'email': 'new@correo.com'}),
+        ]), workers=1)
+
+        self.assertEqual(get_user_model().objects.count(), 2)
+        existing.refresh_from_db()
+        self.assertTrue(existing.check_password('testpass'))
+        self.assertIn('Line 1:', stderr)
+        self.assertIn('Line 5: duplicate email', stderr)
+        self.assertIn('1 users skipped', stderr)
+
+
+class RepairCountersCommandTests(TestCase):
+
+    def test_repair_counters(self):
+        """Test the counters are rebuilt from the recipes tables"""
+        user = get_user_model().objects.create_user(
+            'test@correo.com',
+            'testpass'
+        )
+        tag = Tag.objects.create(user=user, name='Vegan')
+        recipe = Recipe.objects.create(
+            user=user, title='Salad', time_minutes=5, price=5.00
+        )
+        recipe.tags.add(tag)
+        Tag.objects.update(recipe_count=42)
+        RecipeStats.objects.all().delete()
+
+        call_command('repair_counters', stdout=StringIO())
+
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 1)
+        self.assertEqual(RecipeStats.objects.get(user=user).recipe_count, 1)
+
+
+class ProfileStartupCommandTests(TestCase):
+
+    def test_profile_startup(self):
+        """Test the startup report, and that the API loads no lazy module"""
+        out = StringIO()
+
+        call_command('profile_startup', runs=1, top=3, stdout=out)
+
+        report = out.getvalue()
+        self.assertIn('app ready', report)
+        self.assertIn('API URLconf', report)
+        self.assertIn('Import time by package (top 3):', report)
+        for module in ('numpy', 'core.admin'):
+            self.assertRegex(report, rf'{module} +not loaded')
@@ -0,0 +1,148 @@
+import os
+import threading
+from io import StringIO
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.deletion import purge_user, request_user_deletion
+from core.models import (
+    Tag, Ingredient, Recipe, RecipeStats, ChangeLogEntry, IdempotencyKey
+)
+from core.tasks import run_in_background
+from core.tests.factories import (
+    create_user, sample_recipe, sample_tag, sample_ingredient
+)
+
+
+def sample_image():
+    """Return a small uploaded jpeg"""
+    content = Image.new('RGB', (10, 10))
+    path = os.path.join(os.path.dirname(__file__), 'image.jpg')
+    try:
+        content.save(path, format='JPEG')
+        with open(path, 'rb') as f:
+            return SimpleUploadedFile('image.jpg', f.read())
+    finally:
+        os.remove(path)
+
+
+class UserDeletionTests(TestCase):
+    """Test purging the users that asked to be deleted"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.other = create_user(email='other@londonappdev.com')
+        for i in range(3):
+            recipe = sample_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(sample_tag(user=self.user, name=f'Tag {i}'))
+            recipe.ingredients.add(
+                sample_ingredient(user=self.user, name=f'Ingredient {i}')
+            )
+        self.kept = sample_recipe(user=self.other)
+        self.kept.tags.add(sample_tag(user=self.other))
+
+    def test_purge_in_batches(self):
+        """Test that the user and everything it owns goes away"""
+        self.user.deletion_requested_at = '2020-01-01T00:00:00Z'
+        self.user.save()
+
+        counts = purge_user(self.user.id, batch_size=2)
+
+        self.assertEqual(
+            counts, {'recipes': 3, 'tags': 3, 'ingredients': 3}
+        )
+        self.assertFalse(
+            get_user_model().objects.filter(pk=self.user.pk).exists()
+        )
+        self.assertFalse(RecipeStats.objects.filter(user=self.user).exists())
+        self.assertEqual(
+            Recipe.tags.through.objects.get().recipe_id, self.kept.id
+        )
+        self.assertEqual(Recipe.ingredients.through.objects.count(), 0)
+        self.assertEqual(Tag.objects.get().user, self.other)
+        self.assertFalse(Ingredient.objects.exists())
+
+    def test_purge_change_log_in_batches(self):
+        """Test that the change log and idempotency keys of the user are
+           deleted in batches too, not by the final cascade
+        """
+        IdempotencyKey.objects.create(
+            user=self.user, key='key-1', request_fingerprint='x'
+        )
+        logged = ChangeLogEntry.objects.filter(user=self.user).count()
+        self.assertGreater(logged, 2)
+        self.user.deletion_requested_at = '2020-01-01T00:00:00Z'
+        self.user.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            purge_user(self.user.id, batch_size=2)
+
+        deletes = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('DELETE') and
+            'core_changelogentry' in query['sql']
+        ]
+        self.assertEqual(len(deletes), (logged + 1) // 2)
+        self.assertFalse(
+            ChangeLogEntry.objects.filter(user_id=self.user.id).exists()
+        )
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertTrue(ChangeLogEntry.objects.filter(user=self.other))
+
+    def test_purge_requires_deletion_request(self):
+        """Test that active users are never purged"""
+        self.assertIsNone(purge_user(self.user.id))
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_purge_removes_images(self):
+        """Test that the image files of the recipes are removed"""
+        recipe = Recipe.objects.filter(user=self.user).first()
+        recipe.image = sample_image()
+        recipe.save()
+        path = recipe.image.path
+        self.assertTrue(os.path.exists(path))
+
+        request_user_deletion(self.user)
+
+        self.assertFalse(os.path.exists(path))
+
+    def test_purge_command(self):
+        """Test the command purges the users left waiting"""
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False, deletion_requested_at='2020-01-01T00:00:00Z'
+        )
+        out = StringIO()
+
+        call_command('purge_deleted_users', stdout=out)
+
+        self.assertIn('3 recipes', out.getvalue())
+        self.assertEqual(get_user_model().objects.get(), self.other)
+
+
+class BackgroundTaskTests(SimpleTestCase):
+    """Test the background task runner"""
+
+    @override_settings(BACKGROUND_TASKS_EAGER=False)
+    def test_runs_in_worker_thread(self):
+        """Test that tasks run in another thread"""
+        done = threading.Event()
+        threads = []
+
+        def task(value):
+            threads.append((threading.current_thread(), value))
+            done.set()
+
+        run_in_background(task, 'value')
+
+        self.assertTrue(done.wait(timeout=5))
+        self.assertIsNot(threads[0][0], threading.current_thread())
+        self.assertEqual(threads[0][1], 'value')
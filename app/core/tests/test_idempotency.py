@@ -0,0 +1,130 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.idempotency import clear_expired_keys
+from core.models import IdempotencyKey, Recipe, Tag
+from core.tests.factories import create_user
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class IdempotencyKeyTests(TestCase):
+    """Test replaying POSTs sent with an Idempotency-Key"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.payload = {
+            'title': 'Chocolate cheesecake',
+            'time_minutes': 30,
+            'price': '5.00',
+            'tags': [],
+            'ingredients': [],
+        }
+
+    def post(self, url, payload, key):
+        return self.client.post(
+            url, payload, format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retry_replays_first_response(self):
+        """Test that a retry returns the first response without writing"""
+        res1 = self.post(RECIPES_URL, self.payload, 'key-1')
+        res2 = self.post(RECIPES_URL, self.payload, 'key-1')
+
+        self.assertEqual(res1.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res2.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res2.data, res1.data)
+        self.assertEqual(res2['Idempotent-Replayed'], 'true')
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_keys_are_per_user(self):
+        """Test that other users can use the same key"""
+        self.post(TAGS_URL, {'name': 'Vegan'}, 'key-1')
+        other = APIClient()
+        other.force_authenticate(create_user(email='other@londonappdev.com'))
+
+        res = other.post(
+            TAGS_URL, {'name': 'Vegan'}, format='json',
+            HTTP_IDEMPOTENCY_KEY='key-1'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_key_reused_with_other_payload(self):
+        """Test that a key can't be reused for a different request"""
+        self.post(TAGS_URL, {'name': 'Vegan'}, 'key-1')
+
+        res = self.post(TAGS_URL, {'name': 'Dessert'}, 'key-1')
+
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Tag.objects.count(), 1)
+
+    @override_settings(IDEMPOTENCY_KEY_WAIT=0)
+    def test_request_in_progress(self):
+        """Test a duplicate of a request still running gets a conflict"""
+        res = self.post(TAGS_URL, {'name': 'Vegan'}, 'key-1')
+        IdempotencyKey.objects.filter(key='key-1').update(status_code=None)
+        Tag.objects.all().delete()
+
+        res = self.post(TAGS_URL, {'name': 'Vegan'}, 'key-1')
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Tag.objects.exists())
+
+    @override_settings(IDEMPOTENCY_KEY_WAIT=0)
+    def test_abandoned_request_is_run_again(self):
+        """Test a retry runs a request that never responded, once its
+           lease is over
+        """
+        self.post(TAGS_URL, {'name': 'Vegan'}, 'key-1')
+        IdempotencyKey.objects.filter(key='key-1').update(
+            status_code=None,
+            created_at=timezone.now() - timedelta(minutes=10)
+        )
+        Tag.objects.all().delete()
+
+        res = self.post(TAGS_URL, {'name': 'Vegan'}, 'key-1')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', res)
+        self.assertEqual(Tag.objects.count(), 1)
+        record = IdempotencyKey.objects.get(key='key-1')
+        self.assertEqual(record.status_code, status.HTTP_201_CREATED)
+
+    def test_failed_request_releases_key(self):
+        """Test that a rejected request can be fixed and sent again"""
+        res = self.post(TAGS_URL, {'name': ''}, 'key-1')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.post(TAGS_URL, {'name': 'Vegan'}, 'key-1')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_expired_keys(self):
+        """Test that expired keys can be reused and are cleared"""
+        self.post(TAGS_URL, {'name': 'Vegan'}, 'key-1')
+        self.post(TAGS_URL, {'name': 'Dessert'}, 'key-2')
+        IdempotencyKey.objects.filter(key='key-1').update(
+            created_at=timezone.now() - timedelta(days=2)
+        )
+
+        res = self.post(TAGS_URL, {'name': 'Lunch'}, 'key-1')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        IdempotencyKey.objects.update(
+            created_at=timezone.now() - timedelta(days=2)
+        )
+        self.assertEqual(clear_expired_keys(), 2)
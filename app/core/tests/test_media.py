@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core import media
+from core.models import RECIPE_IMAGE_DIR
+from core.tests.factories import create_user, sample_recipe
+
+
+class MediaSweepTests(TestCase):
+    """Test removing the recipe images nothing points to"""
+
+    def setUp(self):
+        # a media root of its own, other tests upload images concurrently
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        os.makedirs(os.path.join(self.media_root, RECIPE_IMAGE_DIR))
+
+        self.referenced = self.write_file('referenced.jpg', age=7200)
+        self.orphan = self.write_file('orphan.jpg', age=7200)
+        self.recent = self.write_file('recent.jpg', age=0)
+        sample_recipe(user=create_user(), image=self.referenced)
+
+    def write_file(self, name, age):
+        """Create an image file written age seconds ago"""
+        name = f'{RECIPE_IMAGE_DIR}{name}'
+        path = os.path.join(self.media_root, name)
+        with open(path, 'wb') as f:
+            f.write(b'image')
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+        return name
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.media_root, name))
+
+    def test_sweep_removes_old_orphans(self):
+        """Test only unreferenced files past the grace period go away"""
+        result = media.sweep_orphaned_media(grace_period=3600, batch_size=2)
+
+        self.assertEqual(result, {'scanned': 3, 'orphaned': 1, 'bytes': 5})
+        self.assertFalse(self.exists(self.orphan))
+        self.assertTrue(self.exists(self.referenced))
+        self.assertTrue(self.exists(self.recent))
+
+    def test_sweep_command_dry_run(self):
+        """Test the dry run reports the orphans without removing them"""
+        out = StringIO()
+
+        call_command('sweep_media', grace_period=0, dry_run=True, stdout=out)
+
+        self.assertIn('Found 2 orphaned files', out.getvalue())
+        self.assertTrue(self.exists(self.orphan))
+        self.assertTrue(self.exists(self.recent))
+
+    @override_settings(MEDIA_SWEEP_INTERVAL=60)
+    def test_background_sweep_throttled(self):
+        """Test that a process sweeps at most once per interval"""
+        with patch('core.media._last_sweep', None), \
+                patch('core.media.run_in_background') as run:
+            self.assertTrue(media.schedule_media_sweep())
+            self.assertFalse(media.schedule_media_sweep())
+
+        run.assert_called_once_with(media.sweep_orphaned_media)
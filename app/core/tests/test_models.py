@@ -89,3 +89,40 @@ class ModelTests(TestCase):
 
         expected_path = f'uploads/recipe/{uuid}.jpg'
         self.assertEqual(file_path, expected_path)
+
+    def test_recipe_count_follows_links(self):
+        """Test tags and ingredients count the recipes linked to them"""
+        user = sample_user()
+        tag = models.Tag.objects.create(user=user, name='Vegan')
+        other = models.Tag.objects.create(user=user, name='Quick')
+        ingredient = models.Ingredient.objects.create(user=user, name='Kale')
+        recipe1 = models.Recipe.objects.create(
+            user=user, title='Kale salad', time_minutes=5, price=5.00
+        )
+        recipe2 = models.Recipe.objects.create(
+            user=user, title='Kale soup', time_minutes=25, price=4.00
+        )
+
+        def counts():
+            return [
+                obj.__class__.objects.get(pk=obj.pk).recipe_count
+                for obj in (tag, other, ingredient)
+            ]
+
+        recipe1.tags.add(tag, other)
+        # adding an existing link or removing a missing one changes nothing
+        recipe1.tags.add(tag)
+        recipe2.tags.remove(other)
+        recipe2.ingredients.add(ingredient)
+        tag.recipe_set.add(recipe2)
+        self.assertEqual(counts(), [2, 1, 1])
+
+        recipe1.tags.set([other])
+        self.assertEqual(counts(), [1, 1, 1])
+
+        recipe2.tags.clear()
+        ingredient.recipe_set.clear()
+        self.assertEqual(counts(), [0, 1, 0])
+
+        recipe1.delete()
+        self.assertEqual(counts(), [0, 0, 0])
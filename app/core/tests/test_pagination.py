@@ -0,0 +1,97 @@
+from unittest import skipIf, skipUnless
+
+from django.core.paginator import EmptyPage
+
+from django.db import connection
+from django.test import TestCase
+
+from core.models import Recipe
+from core.pagination import (
+    EstimatedCountPaginator, estimated_count, planner_estimate
+)
+from core.tests.factories import create_user, create_recipes
+
+
+class EstimateTests(TestCase):
+    """Test the row count estimates of the database"""
+
+    def setUp(self):
+        self.user = create_user()
+        create_recipes(self.user, 3)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Postgres estimates')
+    def test_planner_estimate(self):
+        """Test reading the planner estimate of a filtered queryset"""
+        estimate = planner_estimate(
+            Recipe.objects.filter(user=self.user, price__gte=0)
+        )
+
+        self.assertIsInstance(estimate, int)
+        self.assertGreaterEqual(estimate, 0)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Postgres estimates')
+    def test_planner_estimate_empty_queryset(self):
+        """Test a queryset that can't match any row is estimated empty"""
+        self.assertEqual(planner_estimate(Recipe.objects.none()), 0)
+
+    @skipIf(connection.vendor == 'postgresql', 'Postgres has estimates')
+    def test_no_estimate(self):
+        """Test other databases have no estimate and count the rows"""
+        queryset = Recipe.objects.filter(user=self.user)
+
+        self.assertIsNone(planner_estimate(queryset))
+        self.assertEqual(estimated_count(queryset, threshold=0), (3, False))
+
+    def test_estimated_count_below_threshold(self):
+        """Test small results are counted exactly on every database"""
+        queryset = Recipe.objects.filter(user=self.user, price__gte=0)
+
+        self.assertEqual(
+            estimated_count(queryset, threshold=10 ** 9), (3, False)
+        )
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    """Test paginating with counts that are off"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.recipes = create_recipes(self.user, 5)
+        self.queryset = Recipe.objects.order_by('id')
+
+    def test_count_below_real_rows(self):
+        """Test every row stays reachable when the count is too low"""
+        paginator = EstimatedCountPaginator(self.queryset, 2, known_count=3)
+
+        pages = [paginator.page(number) for number in (1, 2, 3)]
+
+        self.assertEqual(
+            [recipe.id for page in pages for recipe in page],
+            [recipe.id for recipe in self.recipes]
+        )
+        self.assertEqual(
+            [page.has_next() for page in pages], [True, True, False]
+        )
+        self.assertEqual(pages[2].end_index(), 5)
+        self.assertEqual(paginator.count, 5)
+
+    def test_count_above_real_rows(self):
+        """Test pages past the real rows are empty when the count is too
+           high
+        """
+        paginator = EstimatedCountPaginator(self.queryset, 2, known_count=50)
+
+        self.assertFalse(paginator.page(3).has_next())
+        with self.assertRaises(EmptyPage):
+            paginator.page(4)
+
+    def test_empty_first_page(self):
+        """Test the first page of an empty result is allowed"""
+        paginator = EstimatedCountPaginator(
+            Recipe.objects.none(), 2, known_count=0
+        )
+
+        page = paginator.page(1)
+
+        self.assertEqual(len(page), 0)
+        self.assertFalse(page.has_next())
@@ -0,0 +1,60 @@
+from io import StringIO
+from wsgiref.util import setup_testing_defaults
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.core.signals import request_started, request_finished
+from django.db import close_old_connections
+from django.test import SimpleTestCase
+
+from core.wsgi import get_dispatching_application
+
+
+class DispatchingApplicationTests(SimpleTestCase):
+    """Test serving the API with the lean middleware chain"""
+
+    def setUp(self):
+        # like the test client, keep the test database connection open
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_started.connect, close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+        self.application = get_dispatching_application(WSGIHandler())
+
+    def get(self, path):
+        """Send a GET request, return its status and headers"""
+        environ = {'PATH_INFO': path, 'HTTP_HOST': 'testserver'}
+        setup_testing_defaults(environ)
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = status
+            response['headers'] = dict(headers)
+
+        self.application(environ, start_response).close()
+        return response['status'], response['headers']
+
+    def test_api_skips_admin_middleware(self):
+        """Test that API responses skip the clickjacking middleware"""
+        status, headers = self.get('/api/recipe/tags/')
+
+        self.assertTrue(status.startswith('401'))
+        self.assertNotIn('X-Frame-Options', headers)
+
+    def test_admin_uses_full_middleware(self):
+        """Test that the admin keeps the full middleware chain"""
+        status, headers = self.get('/admin/login/')
+
+        self.assertTrue(status.startswith('200'))
+        self.assertIn('X-Frame-Options', headers)
+
+    def test_benchmark_command(self):
+        """Test the middleware benchmark reports both chains"""
+        out = StringIO()
+
+        call_command(
+            'benchmark_middleware', requests=5, host='testserver', stdout=out
+        )
+
+        self.assertIn('full:', out.getvalue())
+        self.assertIn('The API chain saves', out.getvalue())
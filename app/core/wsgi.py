@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+
+
+class LeanWSGIHandler(WSGIHandler):
+    """WSGI handler that runs settings.API_MIDDLEWARE instead of the full
+       settings.MIDDLEWARE chain, and resolves with settings.API_URLCONF
+    """
+
+    def load_middleware(self):
+        # BaseHandler builds the chain from settings.MIDDLEWARE. This runs
+        # once, when the application is created, before serving requests
+        middleware = settings.MIDDLEWARE
+        settings.MIDDLEWARE = settings.API_MIDDLEWARE
+        try:
+            super().load_middleware()
+        finally:
+            settings.MIDDLEWARE = middleware
+
+    def get_response(self, request):
+        # the URLconf without the admin, which is then never imported by
+        # the processes only serving the API
+        request.urlconf = settings.API_URLCONF
+        return super().get_response(request)
+
+
+class PathDispatcher:
+    """WSGI application handing the requests whose path starts with one of
+       the prefixes to its application, the rest to the default one
+    """
+
+    def __init__(self, default, mounts):
+        self.default = default
+        self.mounts = list(mounts)
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        for prefix, application in self.mounts:
+            if path.startswith(prefix):
+                return application(environ, start_response)
+        return self.default(environ, start_response)
+
+
+def get_dispatching_application(default):
+    """Serve settings.API_PATH_PREFIX with the lean middleware chain and
+       everything else (admin, media) with default
+    """
+    return PathDispatcher(
+        default, [(settings.API_PATH_PREFIX, LeanWSGIHandler())]
+    )
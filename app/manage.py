@@ -3,6 +3,9 @@ import os
 import sys
 
 if __name__ == '__main__':
+    # The test suite runs with its own settings unless told otherwise
+    if sys.argv[1:2] == ['test']:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.test_settings')
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
     try:
         from django.core.management import execute_from_command_line
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class RecipeConfig(AppConfig):
     name = 'recipe'
+
+    def ready(self):
+        # connects the receivers that keep the in-process caches fresh
+        from recipe import signals  # noqa: F401
@@ -0,0 +1,102 @@
+import heapq
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection, transaction
+from django.dispatch import receiver
+
+from core.models import normalize_name
+from recipe.lru import LRUCache
+
+
+# cached in place of the names of users with too many of them to cache
+TOO_MANY = object()
+
+_cache = None
+
+
+def get_cache():
+    """Return the per-user name cache of this process"""
+    global _cache
+    if _cache is None:
+        _cache = LRUCache(
+            maxsize=settings.AUTOCOMPLETE_CACHE_USERS,
+            ttl=settings.AUTOCOMPLETE_CACHE_TTL
+        )
+    return _cache
+
+
+@receiver(setting_changed)
+def reset_cache(setting, **kwargs):
+    global _cache
+    if setting.startswith('AUTOCOMPLETE_'):
+        _cache = None
+
+
+class PrefixIndex:
+    """The tags or ingredients of a user sorted by their normalized name,
+       so the ones starting with a prefix are a contiguous slice
+    """
+
+    def __init__(self, rows):
+        # rows are (name_normalized, recipe_count, id, name)
+        self.rows = sorted(rows)
+        self.keys = [row[0] for row in self.rows]
+
+    def search(self, prefix, limit):
+        """Return the most used objects whose name starts with prefix"""
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + '\U0010ffff', lo=start)
+        matches = heapq.nsmallest(
+            limit,
+            (self.rows[i] for i in range(start, end)),
+            key=lambda row: (-row[1], row[3], row[2])
+        )
+        return [{'id': row[2], 'name': row[3]} for row in matches]
+
+
+def _cache_key(model, user_id):
+    return (model._meta.label, user_id)
+
+
+def search_database(model, user_id, prefix, limit):
+    """Look the prefix up with the (user, name_normalized) index"""
+    return list(
+        model.objects.filter(
+            user_id=user_id,
+            name_normalized__startswith=prefix
+        ).order_by('-recipe_count', 'name', 'id').values('id', 'name')[:limit]
+    )
+
+
+def autocomplete(model, user_id, prefix, limit):
+    """Return the top limit tags or ingredients of a user starting with
+       prefix, answered from memory once the user's names are cached
+    """
+    prefix = normalize_name(prefix)
+    cache = get_cache()
+    key = _cache_key(model, user_id)
+    index = cache.get(key)
+    if index is None:
+        max_items = settings.AUTOCOMPLETE_CACHE_MAX_ITEMS
+        rows = list(
+            model.objects.filter(user_id=user_id).values_list(
+                'name_normalized', 'recipe_count', 'id', 'name'
+            )[:max_items + 1]
+        )
+        index = PrefixIndex(rows) if len(rows) <= max_items else TOO_MANY
+        cache.set(key, index)
+    if index is TOO_MANY:
+        return search_database(model, user_id, prefix, limit)
+
+    return index.search(prefix, limit)
+
+
+def invalidate(model, user_id):
+    """Forget the cached names of a user after they changed"""
+    key = _cache_key(model, user_id)
+    get_cache().pop(key)
+    if connection.in_atomic_block:
+        # a request reading before the commit could cache the old names
+        transaction.on_commit(lambda: get_cache().pop(key))
@@ -0,0 +1,212 @@
+import threading
+
+import numpy as np
+
+from core.models import Recipe
+
+
+# number of bits set in every possible byte
+POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)],
+                    dtype=np.uint8)
+
+
+def popcount(bits):
+    """Count the bits set in every row of a uint64 matrix"""
+    return POPCOUNT[bits.view(np.uint8)].sum(axis=1, dtype=np.int64)
+
+
+class RecipeIndex:
+    """The tags and ingredients of the recipes of one user as bitsets.
+
+    Every tag and ingredient of the user gets a bit and every recipe a row
+    of packed uint64 words, so the overlap of one recipe with all the
+    others is a couple of vectorized bitwise operations. Next to them, an
+    inverted index lists the recipes using each ingredient. Both are
+    updated in place when recipes change instead of being rebuilt
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.lock = threading.Lock()
+        # recipes whose row is out of date, refreshed on the next lookup
+        self.dirty = set()
+        self.recipe_ids = np.empty(0, dtype=np.int64)
+        self.rows = {}
+        self.bits = np.zeros((0, 1), dtype=np.uint64)
+        # ('tag', id) or ('ingredient', id) -> bit
+        self.features = {}
+        # inverted index, ingredient id -> ids of the recipes using it
+        self.postings = {}
+        # recipe id -> ids of its ingredients
+        self.ingredients = {}
+
+    @classmethod
+    def build(cls, user_id):
+        """Load the index of a user with one query per relation"""
+        index = cls(user_id)
+        recipe_ids = Recipe.objects.filter(
+            user_id=user_id
+        ).order_by('id').values_list('id', flat=True)
+        index.update(recipe_ids, _links(recipe__user_id=user_id))
+        return index
+
+    def _bit(self, feature):
+        bit = self.features.get(feature)
+        if bit is None:
+            bit = self.features[feature] = len(self.features)
+        return bit
+
+    def update(self, recipe_ids, links):
+        """Replace the rows of recipe_ids with the (recipe id, feature)
+           links given, adding the recipes not indexed yet
+        """
+        recipe_ids = list(recipe_ids)
+        wanted = set(recipe_ids)
+        new_ids = [pk for pk in recipe_ids if pk not in self.rows]
+        self._unlink_ingredients(recipe_ids)
+        rows = [], []
+        for recipe_id, feature in links:
+            # recipes created after recipe_ids were read wait for a refresh
+            if recipe_id not in wanted:
+                continue
+            rows[0].append(recipe_id)
+            rows[1].append(self._bit(feature))
+            kind, pk = feature
+            if kind == 'ingredient':
+                self.postings.setdefault(pk, set()).add(recipe_id)
+                self.ingredients.setdefault(recipe_id, set()).add(pk)
+
+        words = max(len(self.features) + 63, 64) // 64
+        if words > self.bits.shape[1] or new_ids:
+            bits = np.zeros(
+                (len(self.recipe_ids) + len(new_ids), words),
+                dtype=np.uint64
+            )
+            bits[:len(self.recipe_ids), :self.bits.shape[1]] = self.bits
+            self.bits = bits
+        if new_ids:
+            self.recipe_ids = np.concatenate(
+                [self.recipe_ids, np.array(new_ids, dtype=np.int64)]
+            )
+            for pk in new_ids:
+                self.rows[pk] = len(self.rows)
+
+        positions = np.array(
+            [self.rows[pk] for pk in recipe_ids], dtype=np.int64
+        )
+        self.bits[positions] = 0
+        if rows[0]:
+            positions = np.array(
+                [self.rows[pk] for pk in rows[0]], dtype=np.int64
+            )
+            bits = np.array(rows[1], dtype=np.uint64)
+            np.bitwise_or.at(
+                self.bits,
+                (positions, (bits // np.uint64(64)).astype(np.int64)),
+                np.left_shift(np.uint64(1), bits % np.uint64(64))
+            )
+
+    def _unlink_ingredients(self, recipe_ids):
+        """Take recipes out of the inverted index"""
+        for recipe_id in recipe_ids:
+            for pk in self.ingredients.pop(recipe_id, ()):
+                self.postings[pk].discard(recipe_id)
+                if not self.postings[pk]:
+                    del self.postings[pk]
+
+    def remove(self, recipe_ids):
+        """Drop the rows of recipes that were deleted"""
+        self._unlink_ingredients(recipe_ids)
+        positions = [self.rows[pk] for pk in recipe_ids if pk in self.rows]
+        if not positions:
+            return
+        self.bits = np.delete(self.bits, positions, axis=0)
+        self.recipe_ids = np.delete(self.recipe_ids, positions)
+        self.rows = {
+            int(pk): row for row, pk in enumerate(self.recipe_ids)
+        }
+
+    def refresh(self):
+        """Bring the rows of the recipes written since the last lookup up
+           to date. Call with the lock held
+        """
+        if not self.dirty:
+            return
+        dirty, self.dirty = self.dirty, set()
+        existing = set(Recipe.objects.filter(
+            user_id=self.user_id, id__in=dirty
+        ).values_list('id', flat=True))
+        self.remove(dirty - existing)
+        if existing:
+            self.update(sorted(existing), _links(recipe_id__in=existing))
+
+    def similar(self, recipe_id, limit):
+        """Return the (recipe id, score) of the recipes sharing the most
+           tags and ingredients with a recipe, by Jaccard similarity
+        """
+        row = self.rows.get(recipe_id)
+        if row is None or not len(self.recipe_ids):
+            return []
+        target = self.bits[row]
+        shared = popcount(self.bits & target)
+        union = popcount(self.bits | target)
+        scores = shared / np.maximum(union, 1)
+        scores[row] = 0
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            # only sort the best limit of them
+            best = np.argpartition(-scores[candidates], limit - 1)[:limit]
+            candidates = candidates[best]
+        # best score first, the newest recipe first between equal ones
+        order = np.lexsort((-self.recipe_ids[candidates],
+                            -scores[candidates]))
+        candidates = candidates[order]
+
+        return [
+            (int(self.recipe_ids[i]), float(scores[i])) for i in candidates
+        ]
+
+    def cookable(self, ingredient_ids, min_coverage, limit):
+        """Return the (recipe id, coverage) of the recipes with the largest
+           share of their ingredients among ingredient_ids
+        """
+        postings = [
+            np.fromiter(self.postings[pk], dtype=np.int64)
+            for pk in set(ingredient_ids) if pk in self.postings
+        ]
+        if not postings:
+            return []
+        # how many of the ingredients at hand every candidate recipe uses
+        candidates, matched = np.unique(
+            np.concatenate(postings), return_counts=True
+        )
+        totals = np.fromiter(
+            (len(self.ingredients[pk]) for pk in candidates),
+            dtype=np.int64, count=len(candidates)
+        )
+        coverage = matched / totals
+
+        keep = np.flatnonzero(coverage >= min_coverage)
+        if len(keep) > limit:
+            best = np.argpartition(-coverage[keep], limit - 1)[:limit]
+            keep = keep[best]
+        # best coverage first, then the recipes needing the most of the
+        # ingredients, then the newest
+        order = np.lexsort((-candidates[keep], -matched[keep],
+                            -coverage[keep]))
+        keep = keep[order]
+
+        return [(int(candidates[i]), float(coverage[i])) for i in keep]
+
+
+def _links(**filters):
+    """Yield the (recipe id, feature) links of the recipes matching filters"""
+    for relation, field in (('tag', 'tag_id'),
+                            ('ingredient', 'ingredient_id')):
+        through = getattr(Recipe, f'{relation}s').through
+        rows = through.objects.filter(**filters).values_list(
+            'recipe_id', field
+        )
+        for recipe_id, pk in rows.iterator():
+            yield recipe_id, (relation, pk)
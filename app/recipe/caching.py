@@ -0,0 +1,131 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+
+# bump when the detail payload changes shape, so old entries are ignored
+DETAIL_CACHE_VERSION = 1
+
+
+# Details are cached under the generation read before the recipe is. A
+# write committing in between bumps the generation, so a detail read before
+# the write ends up under a key nobody reads any more
+def generation_cache_key(user_id, recipe_id):
+    """Return the cache key of the generation of a recipe detail, bumped
+       on every write to the recipe
+    """
+    return f'recipe:detail-generation:{user_id}:{recipe_id}'
+
+
+def detail_cache_key(user_id, recipe_id, generation):
+    """Return the cache key of the serialized detail of a recipe at a
+       generation
+    """
+    return (
+        f'recipe:detail:v{DETAIL_CACHE_VERSION}:{user_id}:{recipe_id}:'
+        f'{generation}'
+    )
+
+
+def _new_generation():
+    # a counter evicted and started again from the clock doesn't go back
+    # to the values the details cached before are stored under
+    return int(time.time() * 1000000)
+
+
+def get_generations(user_id, recipe_ids):
+    """Return the current generation of the details of several recipes by
+       their id, starting the missing ones
+    """
+    keys = {generation_cache_key(user_id, pk): pk for pk in recipe_ids}
+    generations = {
+        keys[key]: generation
+        for key, generation in cache.get_many(keys).items()
+    }
+    for key, pk in keys.items():
+        if pk not in generations:
+            cache.add(key, _new_generation(), None)
+            generations[pk] = cache.get(key)
+    return generations
+
+
+def enabled():
+    """Whether details are cached, RECIPE_DETAIL_CACHE_TIMEOUT 0 is off"""
+    return bool(settings.RECIPE_DETAIL_CACHE_TIMEOUT)
+
+
+def get_detail(user_id, recipe_id):
+    """Return the cached detail of a recipe, or None, and the generation
+       to cache it under on a miss
+    """
+    if not enabled():
+        return None, None
+    generation = get_generations(user_id, [recipe_id])[recipe_id]
+    return (
+        cache.get(detail_cache_key(user_id, recipe_id, generation)),
+        generation
+    )
+
+
+def set_detail(user_id, recipe_id, generation, data):
+    if not enabled() or generation is None:
+        return
+    cache.set(
+        detail_cache_key(user_id, recipe_id, generation),
+        data,
+        settings.RECIPE_DETAIL_CACHE_TIMEOUT
+    )
+
+
+def get_details(user_id, recipe_ids):
+    """Return the cached details of several recipes by their id, and the
+       generations of all of them
+    """
+    if not enabled():
+        return {}, {}
+    generations = get_generations(user_id, recipe_ids)
+    keys = {
+        detail_cache_key(user_id, pk, generation): pk
+        for pk, generation in generations.items()
+    }
+    details = {
+        keys[key]: data for key, data in cache.get_many(keys).items()
+    }
+    return details, generations
+
+
+def set_details(user_id, details, generations):
+    """Cache the details of several recipes given by their id"""
+    if not enabled():
+        return
+    cache.set_many(
+        {
+            detail_cache_key(user_id, pk, generations[pk]): data
+            for pk, data in details.items()
+            if generations.get(pk) is not None
+        },
+        settings.RECIPE_DETAIL_CACHE_TIMEOUT
+    )
+
+
+def _bump(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # not started yet or evicted
+            cache.add(key, _new_generation(), None)
+
+
+def invalidate_details(recipes):
+    """Bump the generation of the details of (user id, recipe id) pairs"""
+    keys = [generation_cache_key(*recipe) for recipe in recipes]
+    if not keys:
+        return
+    _bump(keys)
+    if connection.in_atomic_block:
+        # a request reading the generation before the commit could still
+        # cache the old detail under it
+        transaction.on_commit(lambda: _bump(keys))
@@ -0,0 +1,81 @@
+import csv
+import json
+from itertools import islice
+
+from core.models import Recipe
+
+
+EXPORT_FIELDS = ('id', 'title', 'time_minutes', 'price', 'link')
+# How many recipes are read from the cursor (and have their tags and
+# ingredients looked up) at a time. Bounds the memory used by an export
+EXPORT_BATCH_SIZE = 1000
+
+
+class Echo:
+    """File-like object that hands back whatever is written into it"""
+
+    def write(self, value):
+        return value
+
+
+def _batches(iterable, size):
+    """Split an iterable in lists of at most size items"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _names_by_recipe(relation, target, recipe_ids):
+    """Return the related names of every recipe id with a single query"""
+    names = {}
+    rows = relation.through.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by(f'{target}__name').values_list('recipe_id', f'{target}__name')
+    for recipe_id, name in rows:
+        names.setdefault(recipe_id, []).append(name)
+    return names
+
+
+def iter_recipes(queryset, batch_size=EXPORT_BATCH_SIZE):
+    """Yield recipes as dicts including the names of tags and ingredients"""
+    rows = queryset.order_by('id').values_list(*EXPORT_FIELDS).iterator(
+        chunk_size=batch_size
+    )
+    for batch in _batches(rows, batch_size):
+        recipe_ids = [row[0] for row in batch]
+        tags = _names_by_recipe(Recipe.tags, 'tag', recipe_ids)
+        ingredients = _names_by_recipe(
+            Recipe.ingredients, 'ingredient', recipe_ids
+        )
+        for row in batch:
+            recipe = dict(zip(EXPORT_FIELDS, row))
+            recipe['price'] = str(recipe['price'])
+            recipe['tags'] = tags.get(recipe['id'], [])
+            recipe['ingredients'] = ingredients.get(recipe['id'], [])
+            yield recipe
+
+
+def export_csv(queryset):
+    """Stream the recipes as CSV lines, tags and ingredients split by ;"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS + ('tags', 'ingredients'))
+    for recipe in iter_recipes(queryset):
+        yield writer.writerow(
+            [recipe[field] for field in EXPORT_FIELDS] +
+            [';'.join(recipe['tags']), ';'.join(recipe['ingredients'])]
+        )
+
+
+def export_jsonl(queryset):
+    """Stream the recipes as JSON Lines, one recipe object per line"""
+    for recipe in iter_recipes(queryset):
+        yield json.dumps(recipe) + '\n'
+
+
+EXPORTERS = {
+    'csv': (export_csv, 'text/csv'),
+    'jsonl': (export_jsonl, 'application/x-ndjson'),
+}
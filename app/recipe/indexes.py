@@ -0,0 +1,99 @@
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection, transaction
+from django.dispatch import receiver
+
+from recipe.lru import LRUCache
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Return the per-user recipe indexes of this process"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = LRUCache(
+                maxsize=settings.RECIPE_INDEX_USERS,
+                ttl=settings.RECIPE_INDEX_TTL
+            )
+        return _registry
+
+
+@receiver(setting_changed)
+def reset_registry(setting, **kwargs):
+    global _registry
+    if setting.startswith('RECIPE_INDEX_'):
+        with _registry_lock:
+            _registry = None
+
+
+def get_index(user_id):
+    """Return the index of a user, building it when needed. The caller
+       must hold index.lock while using it
+    """
+    # numpy takes a good share of the startup time, it is only imported
+    # by the first lookup. The signals keeping the indexes up to date
+    # don't need it
+    from recipe.bitsets import RecipeIndex
+
+    registry = get_registry()
+    index = registry.get(user_id)
+    if index is None:
+        index = RecipeIndex.build(user_id)
+        registry.set(user_id, index)
+    return index
+
+
+def similar_recipes(user_id, recipe_id, limit):
+    """Return the (recipe id, score) of the recipes most like a recipe"""
+    index = get_index(user_id)
+    with index.lock:
+        index.refresh()
+        return index.similar(recipe_id, limit)
+
+
+def cookable_recipes(user_id, ingredient_ids, min_coverage, limit):
+    """Return the (recipe id, coverage) of the recipes best covered by the
+       ingredients a user has
+    """
+    index = get_index(user_id)
+    with index.lock:
+        index.refresh()
+        return index.cookable(ingredient_ids, min_coverage, limit)
+
+
+def _now_and_on_commit(func, *args):
+    """Run func now and again after the current transaction commits.
+
+    A lookup made between the write and its commit refreshes from the old
+    rows and would keep them until RECIPE_INDEX_TTL
+    """
+    func(*args)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: func(*args))
+
+
+def _mark_dirty(user_id, recipe_ids):
+    index = get_registry().get(user_id)
+    if index is not None:
+        with index.lock:
+            index.dirty.update(recipe_ids)
+
+
+def mark_dirty(user_id, recipe_ids):
+    """Have the index of a user refresh some recipes on its next lookup"""
+    _now_and_on_commit(_mark_dirty, user_id, set(recipe_ids))
+
+
+def _invalidate(user_id):
+    get_registry().pop(user_id)
+
+
+def invalidate(user_id):
+    """Drop the index of a user, rebuilt from scratch on the next lookup"""
+    _now_and_on_commit(_invalidate, user_id)
@@ -0,0 +1,40 @@
+from collections import OrderedDict
+from functools import partial
+
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+from core.pagination import EstimatedCountPaginator
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """Opt-in pagination, used when the client sends ?page_size=.
+
+    Large results report the Postgres estimate of their size instead of
+    an exact COUNT(*), flagged with count_is_estimate
+    """
+    django_paginator_class = EstimatedCountPaginator
+    page_size = None
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # views may already know how many objects there are, i.e. from a
+        # maintained counter, and spare the count altogether
+        known_count = None
+        if hasattr(view, 'get_known_count'):
+            known_count = view.get_known_count(queryset)
+        self.django_paginator_class = partial(
+            EstimatedCountPaginator, known_count=known_count
+        )
+
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.page.paginator.count),
+            ('count_is_estimate', self.page.paginator.is_estimate),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
@@ -1,9 +1,31 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+
 from rest_framework import serializers
 
-from core.models import Tag, Ingredient, Recipe
+from core.bulk import get_or_create_by_name, sync_m2m
+from core.models import Tag, Ingredient, Recipe, RecipeStats
+
+
+class UserOwnedNameSerializer(serializers.ModelSerializer):
+    """Serializer for the objects a user has a single one of by name"""
 
+    def validate_name(self, value):
+        """Refuse the names the user already has"""
+        user = self.context['request'].user
+        existing = self.Meta.model.objects.filter(user=user, name=value)
+        if self.instance is not None:
+            existing = existing.exclude(pk=self.instance.pk)
+        if existing.exists():
+            raise serializers.ValidationError(
+                _('You already have one with this name.')
+            )
+        return value
 
-class TagSerializer(serializers.ModelSerializer):
+
+class TagSerializer(UserOwnedNameSerializer):
     """Serializer for Tag objects"""
 
     class Meta:
@@ -12,7 +34,7 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(UserOwnedNameSerializer):
     """Serializer for Ingredient objects"""
 
     class Meta:
@@ -21,14 +43,40 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
+class NameOrPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Related field that takes either the id or the name of an object.
+       Numbers are ids, any other text is the name of an object that is
+       created when the user doesn't have it yet
+    """
+    default_error_messages = {
+        'incorrect_type': _(
+            'Incorrect type. Expected pk value or name, received '
+            '{data_type}.'
+        ),
+    }
+
+    def to_internal_value(self, data):
+        # Ids are checked (and names resolved) for all the items at once
+        # by the RecipeSerializer instead of one query per item
+        if isinstance(data, bool) or not isinstance(data, (int, str)):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        # isdigit() is also true for digits int() refuses, like '²'
+        if isinstance(data, int) or data.strip().isdecimal():
+            return int(data)
+        if not data.strip():
+            self.fail('required')
+        return data.strip()[:255]
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     """Serializer for Recipe objects"""
-    # Lists the ingredients by their ids (their PK)
-    ingredients = serializers.PrimaryKeyRelatedField(
+    # Lists the ingredients by their ids (their PK). When writing, names
+    # can be used too
+    ingredients = NameOrPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = NameOrPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -46,6 +94,75 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('id',)
 
+    related_models = (('tags', Tag), ('ingredients', Ingredient))
+
+    def validate(self, attrs):
+        """Check all the related ids exist and belong to the user, with one
+           query per type
+        """
+        user = self.context['request'].user
+        for field, model in self.related_models:
+            ids = {value for value in attrs.get(field, []) if
+                   isinstance(value, int)}
+            # the objects of other users are reported as not existing
+            missing = ids - set(model.objects.filter(
+                user=user, pk__in=ids
+            ).values_list('pk', flat=True))
+            if missing:
+                raise serializers.ValidationError({field: [
+                    self.fields[field].child_relation.error_messages[
+                        'does_not_exist'
+                    ].format(pk_value=pk)
+                    for pk in sorted(missing)
+                ]})
+
+        return attrs
+
+    def create(self, validated_data):
+        """Create a recipe and its related objects in one transaction"""
+        related = self._pop_related(validated_data)
+        with transaction.atomic():
+            recipe = Recipe.objects.create(**validated_data)
+            self._set_related(recipe, related)
+
+        return recipe
+
+    def update(self, instance, validated_data):
+        """Update a recipe and its related objects in one transaction"""
+        related = self._pop_related(validated_data)
+        with transaction.atomic():
+            recipe = super().update(instance, validated_data)
+            self._set_related(recipe, related)
+
+        return recipe
+
+    def _pop_related(self, validated_data):
+        """Take the given tags and ingredients out of the validated data"""
+        return {
+            field: validated_data.pop(field)
+            for field, _ in self.related_models
+            if field in validated_data
+        }
+
+    def _set_related(self, recipe, related):
+        """Link the recipe to the given ids and names, creating in bulk the
+           objects for the names the user doesn't have yet
+        """
+        for field, model in self.related_models:
+            if field not in related:
+                continue
+            values = related[field]
+            name_ids = get_or_create_by_name(model, (
+                (recipe.user_id, value) for value in values
+                if not isinstance(value, int)
+            ))
+            # only the links that changed are written
+            sync_m2m(recipe, field, (
+                value if isinstance(value, int)
+                else name_ids[(recipe.user_id, value)]
+                for value in values
+            ))
+
 
 class RecipeDetailSerializer(RecipeSerializer):
     """Serialize a recipe detail"""
@@ -61,3 +178,50 @@ class RecipeImageSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ('id', 'image')
         read_only_fields = ('id',)
+
+
+class RecipeStatsSerializer(serializers.ModelSerializer):
+    """Serializer for the recipe statistics of a user"""
+    avg_time_minutes = serializers.SerializerMethodField()
+    avg_price = serializers.SerializerMethodField()
+    top_tags = serializers.SerializerMethodField()
+    top_ingredients = serializers.SerializerMethodField()
+
+    # How many of the most used tags and ingredients are listed
+    top_count = 5
+
+    class Meta:
+        model = RecipeStats
+        fields = (
+            'recipe_count',
+            'avg_time_minutes',
+            'avg_price',
+            'top_tags',
+            'top_ingredients'
+        )
+        read_only_fields = fields
+
+    def get_avg_time_minutes(self, obj):
+        if not obj.recipe_count:
+            return None
+        return round(obj.total_time_minutes / obj.recipe_count, 1)
+
+    def get_avg_price(self, obj):
+        if not obj.recipe_count:
+            return None
+        average = Decimal(obj.total_price) / obj.recipe_count
+        return str(average.quantize(Decimal('0.01')))
+
+    def get_top_tags(self, obj):
+        return self._top(Tag, obj.user_id)
+
+    def get_top_ingredients(self, obj):
+        return self._top(Ingredient, obj.user_id)
+
+    def _top(self, model, user_id):
+        """Return the objects of the user used by the most recipes"""
+        return list(
+            model.objects.filter(user_id=user_id, recipe_count__gt=0)
+            .order_by('-recipe_count', 'name')
+            .values('id', 'name', 'recipe_count')[:self.top_count]
+        )
@@ -0,0 +1,133 @@
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete
+)
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe
+
+from recipe import autocomplete, caching, indexes
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_autocomplete(sender, instance, **kwargs):
+    """Drop the cached names of the owner of a changed tag or ingredient"""
+    autocomplete.invalidate(sender, instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_autocomplete_ranking(sender, instance, action, **kwargs):
+    """Recipe links change the recipe_count the suggestions are ranked by"""
+    if action.startswith('post_'):
+        model = Tag if sender is Recipe.tags.through else Ingredient
+        autocomplete.invalidate(model, instance.user_id)
+
+
+@receiver(pre_delete, sender=Recipe)
+def invalidate_autocomplete_on_recipe_delete(sender, instance, **kwargs):
+    for model in (Tag, Ingredient):
+        autocomplete.invalidate(model, instance.user_id)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def refresh_recipe_index(sender, instance, **kwargs):
+    """Have the recipe index of the owner pick up a created or deleted
+       recipe on its next lookup
+    """
+    indexes.mark_dirty(instance.user_id, [instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def refresh_recipe_index_links(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    """Have the recipe index refresh the recipes whose links changed"""
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        indexes.mark_dirty(instance.user_id, [instance.pk])
+        return
+    # a tag or ingredient was linked to (or unlinked from) recipes. The
+    # unlinked ones are remembered by the recipe_count receivers
+    if action == 'post_add':
+        recipe_ids = pk_set
+    else:
+        recipe_ids = getattr(instance, '_unlinked_ids', None)
+    if recipe_ids is None:
+        indexes.invalidate(instance.user_id)
+    else:
+        indexes.mark_dirty(instance.user_id, recipe_ids)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_recipe_index(sender, instance, **kwargs):
+    """Deleting a tag or ingredient unlinks it without m2m_changed"""
+    indexes.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_detail(sender, instance, **kwargs):
+    """Drop the cached detail of a written recipe"""
+    recipes = [(instance.user_id, instance.pk)]
+    # the recipe may have been moved from another user
+    previous = getattr(instance, '_previous_totals', None)
+    if previous and previous[0] != instance.user_id:
+        recipes.append((previous[0], instance.pk))
+    caching.invalidate_details(recipes)
+
+
+def _recipe_owners(recipe_ids):
+    return Recipe.objects.filter(id__in=recipe_ids).values_list(
+        'user_id', 'id'
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_recipe_detail_links(sender, instance, action, reverse, pk_set,
+                                   **kwargs):
+    """Drop the cached details of the recipes whose links changed"""
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        caching.invalidate_details([(instance.user_id, instance.pk)])
+        return
+    if action == 'post_add':
+        recipe_ids = pk_set
+    else:
+        recipe_ids = getattr(instance, '_unlinked_ids', None) or ()
+    if recipe_ids:
+        caching.invalidate_details(_recipe_owners(recipe_ids))
+
+
+def _linked_recipes(sender, instance):
+    """Return the (user id, recipe id) of the recipes using a tag or
+       ingredient
+    """
+    through = Recipe.tags.through if sender is Tag else \
+        Recipe.ingredients.through
+    field = 'tag_id' if sender is Tag else 'ingredient_id'
+    return through.objects.filter(**{field: instance.pk}).values_list(
+        'recipe__user_id', 'recipe_id'
+    )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def invalidate_recipe_detail_on_rename(sender, instance, created, **kwargs):
+    """The details list the names of their tags and ingredients"""
+    if not created:
+        caching.invalidate_details(_linked_recipes(sender, instance))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def invalidate_recipe_detail_on_delete(sender, instance, **kwargs):
+    # the links are gone by post_delete
+    caching.invalidate_details(list(_linked_recipes(sender, instance)))
@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from core.models import ChangeLogEntry, Tag, Ingredient, Recipe
+
+from recipe import serializers
+
+
+# change log type -> (model, serializer, key of the response)
+SYNCED_TYPES = {
+    ChangeLogEntry.RECIPE: (Recipe, serializers.RecipeSerializer, 'recipes'),
+    ChangeLogEntry.TAG: (Tag, serializers.TagSerializer, 'tags'),
+    ChangeLogEntry.INGREDIENT: (
+        Ingredient, serializers.IngredientSerializer, 'ingredients'
+    ),
+}
+
+
+def _settled_before():
+    """Return the time before which every logged change is committed.
+
+    The ids of the log are handed out when the entries are inserted, not
+    when their transaction commits, so a write still in progress can hold
+    an id lower than a committed one. Serving the committed one would move
+    the cursor past the other for good. Only the entries older than
+    CHANGE_LOG_SAFETY_LAG seconds are served, this holds as long as no
+    write transaction lasts longer than that
+    """
+    return timezone.now() - timedelta(seconds=settings.CHANGE_LOG_SAFETY_LAG)
+
+
+def _reset():
+    """Tell the app to download everything again and sync from now on"""
+    # the changes not settled yet are sent again after the download
+    latest = ChangeLogEntry.objects.filter(
+        created_at__lte=_settled_before()
+    ).aggregate(latest=Max('id'))['latest']
+    return {'reset': True, 'cursor': latest or 0, 'has_more': False}
+
+
+def changes_since(user, cursor, limit):
+    """Return the recipes, tags and ingredients of a user written after
+       the cursor and the ids of the deleted ones, at most limit changes
+       at a time.
+
+    Asks for a reset when the cursor is 0 or older than the change log
+    kept, the app has to download the full collections then. The cursor
+    only moves past changes settled for CHANGE_LOG_SAFETY_LAG seconds, so
+    it never skips a change committed later
+    """
+    oldest = ChangeLogEntry.objects.aggregate(oldest=Min('id'))['oldest']
+    if cursor <= 0 or (oldest is not None and cursor < oldest - 1):
+        return _reset()
+
+    entries = list(
+        ChangeLogEntry.objects.filter(user=user, id__gt=cursor)
+        .order_by('id')
+        .values_list('id', 'object_type', 'object_id', 'deleted',
+                     'created_at')[:limit + 1]
+    )
+    settled_before = _settled_before()
+    for i, entry in enumerate(entries):
+        if entry[4] > settled_before:
+            # this one and the ones after wait for the next sync
+            entries = entries[:i]
+            break
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    # only the last change of every object matters
+    latest = {}
+    for _, object_type, object_id, deleted, _ in entries:
+        latest[(object_type, object_id)] = deleted
+
+    result = {
+        'reset': False,
+        'cursor': entries[-1][0] if entries else cursor,
+        'has_more': has_more,
+        'deleted': {},
+    }
+    for object_type, (model, serializer, key) in SYNCED_TYPES.items():
+        changed = [
+            object_id for (kind, object_id), deleted in latest.items()
+            if kind == object_type and not deleted
+        ]
+        objects = model.objects.filter(user=user, id__in=changed)
+        if model is Recipe:
+            objects = objects.prefetch_related('tags', 'ingredients')
+        objects = list(objects.order_by('id'))
+        found = {obj.id for obj in objects}
+        result[key] = serializer(objects, many=True).data
+        # deleted after this page of the log, its tombstone comes later
+        result['deleted'][key] = sorted(
+            {object_id for (kind, object_id), deleted in latest.items()
+             if kind == object_type and deleted} |
+            (set(changed) - found)
+        )
+
+    return result
@@ -0,0 +1,119 @@
+from unittest.mock import patch
+
+from django.urls import reverse
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+
+from core.tests.factories import create_user, sample_recipe
+
+from recipe import autocomplete
+
+TAG_AUTOCOMPLETE_URL = reverse('recipe:tag-autocomplete')
+INGREDIENT_AUTOCOMPLETE_URL = reverse('recipe:ingredient-autocomplete')
+
+
+class AutocompleteApiTests(TestCase):
+    """Test the tag and ingredient autocomplete endpoints"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(password='password123')
+
+    def setUp(self):
+        autocomplete.get_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_login_required(self):
+        """Test that login is required for the suggestions"""
+        res = APIClient().get(TAG_AUTOCOMPLETE_URL, {'q': 'v'})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_prefix_match_ignores_case_and_spaces(self):
+        """Test suggesting the names starting with the query"""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        veggie = Tag.objects.create(user=self.user, name='veggie')
+        Tag.objects.create(user=self.user, name='Dessert')
+
+        res = self.client.get(TAG_AUTOCOMPLETE_URL, {'q': '  VEG'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {'id': vegan.id, 'name': 'Vegan'},
+            {'id': veggie.id, 'name': 'veggie'},
+        ])
+
+    def test_ranked_by_recipe_count(self):
+        """Test that the most used names come first and limit applies"""
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        sugar = Ingredient.objects.create(user=self.user, name='Sugar')
+        Ingredient.objects.create(user=self.user, name='Spinach')
+        recipe = sample_recipe(user=self.user)
+        recipe.ingredients.add(sugar)
+
+        res = self.client.get(
+            INGREDIENT_AUTOCOMPLETE_URL, {'q': 's', 'limit': 2}
+        )
+
+        self.assertEqual(
+            [item['id'] for item in res.data], [sugar.id, salt.id]
+        )
+
+    def test_limited_to_user(self):
+        """Test that other users' names are not suggested"""
+        other = create_user(email='other@londonappdev.com')
+        Tag.objects.create(user=other, name='Vegan')
+
+        res = self.client.get(TAG_AUTOCOMPLETE_URL, {'q': 'veg'})
+
+        self.assertEqual(res.data, [])
+
+    def test_cache_evicted_again_on_commit(self):
+        """Test that names cached before a write commits are dropped"""
+        callbacks = []
+        with patch('recipe.autocomplete.transaction.on_commit',
+                   callbacks.append):
+            Tag.objects.create(user=self.user, name='Vegan')
+        # a request reading before the commit
+        self.client.get(TAG_AUTOCOMPLETE_URL, {'q': 'v'})
+        self.assertIsNotNone(autocomplete.get_cache().get(
+            autocomplete._cache_key(Tag, self.user.id)
+        ))
+
+        for callback in callbacks:
+            callback()
+
+        self.assertIsNone(autocomplete.get_cache().get(
+            autocomplete._cache_key(Tag, self.user.id)
+        ))
+
+    def test_cache_evicted_on_create(self):
+        """Test that a new tag shows up after the names were cached"""
+        self.client.get(TAG_AUTOCOMPLETE_URL, {'q': 'veg'})
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        with self.assertNumQueries(1):
+            res = self.client.get(TAG_AUTOCOMPLETE_URL, {'q': 'veg'})
+        with self.assertNumQueries(0):
+            self.client.get(TAG_AUTOCOMPLETE_URL, {'q': 'veg'})
+
+        self.assertEqual(res.data, [{'id': tag.id, 'name': 'Vegan'}])
+
+    @override_settings(AUTOCOMPLETE_CACHE_MAX_ITEMS=1)
+    def test_database_search_for_many_names(self):
+        """Test searching the database for users with too many names"""
+        Tag.objects.bulk_create([
+            Tag(user=self.user, name='Vegan'),
+            Tag(user=self.user, name='Vegetarian'),
+        ])
+
+        res = self.client.get(TAG_AUTOCOMPLETE_URL, {'q': 'vege'})
+
+        self.assertEqual(
+            [item['name'] for item in res.data], ['Vegetarian']
+        )
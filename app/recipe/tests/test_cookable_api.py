@@ -0,0 +1,85 @@
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.tests.factories import (
+    create_user, sample_recipe, sample_ingredient
+)
+
+from recipe import indexes
+
+COOKABLE_URL = reverse('recipe:recipe-cookable')
+
+
+class CookableRecipesApiTests(TestCase):
+    """Test the endpoint finding recipes for the ingredients at hand"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+
+    def setUp(self):
+        indexes.get_registry().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.eggs = sample_ingredient(user=self.user, name='Eggs')
+        self.milk = sample_ingredient(user=self.user, name='Milk')
+        self.flour = sample_ingredient(user=self.user, name='Flour')
+        self.omelette = sample_recipe(user=self.user, title='Omelette')
+        self.omelette.ingredients.add(self.eggs)
+        self.pancakes = sample_recipe(user=self.user, title='Pancakes')
+        self.pancakes.ingredients.add(self.eggs, self.milk, self.flour)
+
+    def get(self, ingredients, **params):
+        params['ingredients'] = ','.join(str(obj.id) for obj in ingredients)
+        return self.client.get(COOKABLE_URL, params)
+
+    def test_fully_covered_recipes(self):
+        """Test that by default every ingredient must be at hand"""
+        res = self.get([self.eggs, self.milk])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in res.data], [self.omelette.id]
+        )
+        self.assertEqual(res.data[0]['coverage'], 1)
+
+    def test_min_coverage(self):
+        """Test ranking the mostly covered recipes by coverage"""
+        res = self.get([self.eggs, self.milk], min_coverage=0.5)
+
+        self.assertEqual(
+            [(item['id'], item['coverage']) for item in res.data],
+            [(self.omelette.id, 1), (self.pancakes.id, round(2 / 3, 4))]
+        )
+
+    def test_index_updated_on_writes(self):
+        """Test that recipes getting new ingredients drop out"""
+        self.get([self.eggs])
+        self.omelette.ingredients.add(self.milk)
+
+        res = self.get([self.eggs])
+
+        self.assertEqual(res.data, [])
+
+    def test_limited_to_user(self):
+        """Test that other users' recipes are not suggested"""
+        other = create_user(email='other@londonappdev.com')
+        recipe = sample_recipe(user=other)
+        recipe.ingredients.add(sample_ingredient(user=other, name='Eggs'))
+
+        res = self.client.get(
+            COOKABLE_URL, {'ingredients': recipe.ingredients.get().id}
+        )
+
+        self.assertEqual(res.data, [])
+
+    def test_invalid_params(self):
+        """Test that bad ingredient lists and coverages are rejected"""
+        res = self.client.get(COOKABLE_URL)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.get([self.eggs], min_coverage=2)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,146 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.tests.factories import (
+    create_user, sample_recipe, sample_tag, sample_ingredient
+)
+
+from recipe import caching
+
+
+BATCH_URL = reverse('recipe:recipe-batch')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}}, RECIPE_DETAIL_CACHE_TIMEOUT=300)
+class RecipeDetailCacheTests(TestCase):
+    """Test caching the serialized recipe details"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user, title='Curry')
+        self.tag = sample_tag(user=self.user, name='Spicy')
+        self.recipe.tags.add(self.tag)
+        self.url = detail_url(self.recipe.id)
+
+    def get_cached(self):
+        """Fill the cache and check the next request is served from it"""
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            return self.client.get(self.url)
+
+    def test_detail_served_from_cache(self):
+        """Test that a cached detail needs no queries"""
+        res = self.get_cached()
+
+        self.assertEqual(res.data['title'], 'Curry')
+        self.assertEqual(res.data['tags'][0]['name'], 'Spicy')
+
+    @override_settings(RECIPE_DETAIL_CACHE_TIMEOUT=0)
+    def test_off_without_timeout(self):
+        """Test a timeout of 0 (the default without a shared cache) turns
+           the cache off
+        """
+        self.client.get(self.url)
+
+        with self.settings(RECIPE_DETAIL_CACHE_TIMEOUT=300):
+            data, _ = caching.get_detail(self.user.id, self.recipe.id)
+        self.assertIsNone(data)
+
+    def test_invalidated_on_recipe_save(self):
+        """Test that a changed recipe is served fresh"""
+        self.get_cached()
+        self.recipe.title = 'Green curry'
+        self.recipe.save()
+
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.data['title'], 'Green curry')
+
+    def test_read_before_commit_not_served_after(self):
+        """Test that a detail read before a write commits and cached after
+           it is not served
+        """
+        callbacks = []
+        with patch('recipe.caching.transaction.on_commit', callbacks.append):
+            self.recipe.title = 'Green curry'
+            self.recipe.save()
+        # a request missing the cache and reading the old row before the
+        # commit, caching it once the write has committed
+        _, generation = caching.get_detail(self.user.id, self.recipe.id)
+        for callback in callbacks:
+            callback()
+        caching.set_detail(
+            self.user.id, self.recipe.id, generation, {'title': 'Curry'}
+        )
+
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.data['title'], 'Green curry')
+
+    def test_invalidated_on_links_changed(self):
+        """Test that adding and removing links drops the detail"""
+        self.get_cached()
+        self.recipe.ingredients.add(sample_ingredient(user=self.user))
+        res = self.client.get(self.url)
+        self.assertEqual(len(res.data['ingredients']), 1)
+
+        self.get_cached()
+        self.tag.recipe_set.clear()
+        res = self.client.get(self.url)
+        self.assertEqual(res.data['tags'], [])
+
+    def test_invalidated_on_tag_rename_and_delete(self):
+        """Test that the names in the detail follow their tags"""
+        self.get_cached()
+        self.tag.name = 'Hot'
+        self.tag.save()
+        res = self.client.get(self.url)
+        self.assertEqual(res.data['tags'][0]['name'], 'Hot')
+
+        self.get_cached()
+        self.tag.delete()
+        res = self.client.get(self.url)
+        self.assertEqual(res.data['tags'], [])
+
+    def test_not_shared_between_users(self):
+        """Test other users can't read a cached detail"""
+        self.get_cached()
+        other = APIClient()
+        other.force_authenticate(create_user(email='other@londonappdev.com'))
+
+        res = other.get(self.url)
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_batch_uses_cached_details(self):
+        """Test that the batch endpoint reads and fills the cache"""
+        other = sample_recipe(user=self.user, title='Soup')
+        self.client.get(self.url)
+        params = {'ids': f'{other.id},{self.recipe.id}'}
+
+        # only the recipe missing from the cache is queried
+        with self.assertNumQueries(3):
+            res = self.client.get(BATCH_URL, params)
+        with self.assertNumQueries(0):
+            self.client.get(BATCH_URL, params)
+
+        self.assertEqual(
+            [item['title'] for item in res.data['results']], ['Soup', 'Curry']
+        )
@@ -7,10 +7,13 @@ from rest_framework.test import APIClient
 
 from core.models import Ingredient, Recipe
 
+from core.tests.factories import create_user
+
 from recipe.serializers import IngredientSerializer
 
 
 INGREDIENTS_URL = reverse('recipe:ingredient-list')
+BULK_INGREDIENTS_URL = reverse('recipe:ingredient-bulk')
 
 
 class PublicIngredientsApiTests(TestCase):
@@ -29,12 +32,12 @@ class PublicIngredientsApiTests(TestCase):
 class PrivateIngredientsApiTests(TestCase):
     """Test the private ingredients API"""
 
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(password='password123')
+
     def setUp(self):
         self.client = APIClient()
-        self.user = get_user_model().objects.create_user(
-            'test@correo.com',
-            'password123'
-        )
         self.client.force_authenticate(self.user)
 
     def test_retrieve_ingredients_list(self):
@@ -132,3 +135,27 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
 
         self.assertEqual(len(res.data), 1)
+
+    def test_create_ingredient_duplicate_name(self):
+        """Test a user can't have two ingredients with the same name"""
+        Ingredient.objects.create(user=self.user, name='Salt')
+
+        res = self.client.post(INGREDIENTS_URL, {'name': 'Salt'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_ingredients(self):
+        """Test getting the ids of a list of ingredients"""
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+        res = self.client.post(
+            BULK_INGREDIENTS_URL, {'names': ['Salt', 'Pepper']},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        pepper = Ingredient.objects.get(user=self.user, name='Pepper')
+        self.assertEqual(res.data, [
+            {'id': salt.id, 'name': 'Salt', 'created': False},
+            {'id': pepper.id, 'name': 'Pepper', 'created': True},
+        ])
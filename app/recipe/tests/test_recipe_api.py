@@ -1,10 +1,15 @@
 import tempfile
 import os
+import csv
+import io
+import json
+from unittest.mock import patch
 
 from PIL import Image
 
-from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
@@ -12,10 +17,16 @@ from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
 
+from core.tests.factories import (
+    create_user, create_recipes, sample_recipe, sample_tag, sample_ingredient
+)
+
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 
 RECIPES_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+BATCH_URL = reverse('recipe:recipe-batch')
 
 
 def image_upload_url(recipe_id):
@@ -28,31 +39,6 @@ def detail_url(recipe_id):
     return reverse('recipe:recipe-detail', args=[recipe_id])
 
 
-def sample_recipe(user, **params):
-    """Create and return a sample recipe"""
-    defaults = {
-        'title': 'Sample recipe',
-        'time_minutes': 10,
-        'price': 5.00
-    }
-    # Adds or/and updates defaults dict with
-    # whatever attr we pass through the function
-    defaults.update(params)
-
-    return Recipe.objects.create(user=user, **defaults)
-
-
-# we do not provive **params because there are only 2 attrs in a Tag obj
-def sample_tag(user, name='Main course'):
-    """Create and return a sample tag"""
-    return Tag.objects.create(user=user, name=name)
-
-
-def sample_ingredient(user, name='Cinnamon'):
-    """Create and return a simple ingredient"""
-    return Ingredient.objects.create(user=user, name=name)
-
-
 class PublicRecipeApiTests(TestCase):
     """Test an authenticated recipe API access"""
 
@@ -69,33 +55,31 @@ class PublicRecipeApiTests(TestCase):
 class PrivateRecipeApiTests(TestCase):
     """Test unauthenticated recipe API access"""
 
+    @classmethod
+    def setUpTestData(cls):
+        # created once for the whole class, each test rolls back its changes
+        cls.user = create_user()
+
     def setUp(self):
         self.client = APIClient()
-        self.user = get_user_model().objects.create_user(
-            'test@correo.com',
-            'testpass'
-        )
         self.client.force_authenticate(self.user)
 
     def test_retrieve_recipes(self):
         """Test retrieving a list of recipes"""
-        sample_recipe(user=self.user)
-        sample_recipe(user=self.user)
+        create_recipes(self.user, 2)
 
         res = self.client.get(RECIPES_URL)
 
-        recipes = Recipe.objects.all().order_by('-id')
+        recipes = Recipe.objects.all()
         # We want to retrieve data as a list. Thats why we use many=True
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        # the order of the list is tested with the pagination
+        self.assertCountEqual(res.data, serializer.data)
 
     def test_recipes_limited_to_user(self):
         """Test retrieving recipes for user"""
-        user2 = get_user_model().objects.create_user(
-            'correo@correo.com',
-            'testpass'
-        )
+        user2 = create_user(email='correo@correo.com')
         sample_recipe(user=user2)
         sample_recipe(user=self.user)
 
@@ -185,6 +169,112 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_create_recipe_with_tag_names(self):
+        """Test creating a recipe referencing tags by name"""
+        existing = sample_tag(user=self.user, name='Vegan')
+        payload = {
+            'title': 'Avocado toast',
+            'tags': ['Vegan', 'Breakfast'],
+            'ingredients': [],
+            'time_minutes': 5,
+            'price': 4.00
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertIn(existing, recipe.tags.all())
+        self.assertTrue(
+            Tag.objects.filter(user=self.user, name='Breakfast').exists()
+        )
+        # the existing tag is reused instead of creating a duplicate
+        self.assertEqual(Tag.objects.filter(name='Vegan').count(), 1)
+        self.assertEqual(len(res.data['tags']), 2)
+
+    def test_create_recipe_with_ingredient_ids_and_names(self):
+        """Test creating a recipe mixing ingredient ids and names"""
+        ingredient = sample_ingredient(user=self.user, name='Lime')
+        payload = {
+            'title': 'Key lime pie',
+            'tags': [],
+            'ingredients': [ingredient.id, 'Condensed milk'],
+            'time_minutes': 60,
+            'price': 10.00
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        names = set(recipe.ingredients.values_list('name', flat=True))
+        self.assertEqual(names, {'Lime', 'Condensed milk'})
+        new_ingredient = Ingredient.objects.get(name='Condensed milk')
+        self.assertEqual(new_ingredient.user, self.user)
+
+    def test_create_recipe_with_digit_like_tag_name(self):
+        """Test names made of digits int() can't parse are taken as names"""
+        payload = {
+            'title': 'Squared',
+            'tags': ['\u00b2'],
+            'ingredients': [],
+            'time_minutes': 5,
+            'price': 1.00
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(
+            Tag.objects.filter(user=self.user, name='\u00b2').exists()
+        )
+
+    def test_create_recipe_invalid_tag_id(self):
+        """Test creating a recipe with an unknown tag id fails"""
+        payload = {
+            'title': 'Ghost recipe',
+            'tags': [999, 'New tag'],
+            'ingredients': [],
+            'time_minutes': 5,
+            'price': 1.00
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(Tag.objects.exists())
+
+    def test_create_recipe_with_other_users_tag(self):
+        """Test a recipe can't be linked to the tag of another user"""
+        user2 = create_user(email='correo@correo.com')
+        tag = sample_tag(user=user2, name='Not mine')
+        payload = {
+            'title': 'Borrowed tag',
+            'tags': [tag.id],
+            'ingredients': [],
+            'time_minutes': 5,
+            'price': 1.00
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
+        self.assertFalse(Recipe.objects.exists())
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 0)
+
+    def test_partial_update_recipe_with_tag_names(self):
+        """Test replacing the tags of a recipe by name"""
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user, name='Lunch'))
+
+        url = detail_url(recipe.id)
+        res = self.client.patch(url, {'tags': ['Dinner']}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        tags = recipe.tags.all()
+        self.assertEqual(len(tags), 1)
+        self.assertEqual(tags[0].name, 'Dinner')
+
     def test_partial_update_recipe(self):
         """Test updating a recipe with patch"""
         recipe = sample_recipe(user=self.user)
@@ -224,15 +314,225 @@ class PrivateRecipeApiTests(TestCase):
         # The recipe doesn't have any tag assigned so their must be 0
         self.assertEqual(len(tags), 0)
 
+    def test_update_recipe_writes_only_changed_links(self):
+        """Test that links kept by an update are not deleted and added"""
+        recipe = sample_recipe(user=self.user)
+        kept = sample_ingredient(user=self.user, name='Salt')
+        dropped = sample_ingredient(user=self.user, name='Sugar')
+        added = sample_ingredient(user=self.user, name='Pepper')
+        recipe.ingredients.add(kept, dropped)
+        table = Recipe.ingredients.through._meta.db_table
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.patch(
+                detail_url(recipe.id),
+                {'ingredients': [kept.id, added.id]},
+                format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(recipe.ingredients.all()), {kept, added}
+        )
+        writes = [
+            query['sql'] for query in queries
+            if table in query['sql'] and
+            query['sql'].startswith(('INSERT', 'DELETE'))
+        ]
+        self.assertEqual(len(writes), 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.patch(
+                detail_url(recipe.id),
+                {'ingredients': [added.id, kept.id]},
+                format='json'
+            )
+        self.assertFalse([
+            query for query in queries
+            if table in query['sql'] and
+            query['sql'].startswith(('INSERT', 'DELETE'))
+        ])
+
+    def test_list_recipes_paginated(self):
+        """Test paginating recipes when a page size is given"""
+        recipes = create_recipes(self.user, 5)
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2, 'page': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 5)
+        self.assertFalse(res.data['count_is_estimate'])
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']],
+            [recipes[2].id, recipes[1].id]
+        )
+
+    @patch('core.pagination.planner_estimate', return_value=250000)
+    def test_list_recipes_estimated_count(self, mock_estimate):
+        """Test big results report the planner estimate as count"""
+        create_recipes(self.user, 3)
+
+        with self.settings(ESTIMATED_COUNT_THRESHOLD=1000):
+            res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(res.data['count'], 250000)
+        self.assertTrue(res.data['count_is_estimate'])
+        self.assertEqual(len(res.data['results']), 2)
+
+    @patch('core.pagination.planner_estimate', return_value=3)
+    def test_list_recipes_estimate_below_real_count(self, mock_estimate):
+        """Test every recipe can be paged through when the estimate is low"""
+        recipes = create_recipes(self.user, 5)
+
+        ids = []
+        url, params = RECIPES_URL, {'page_size': 2, 'min_price': 0}
+        with self.settings(ESTIMATED_COUNT_THRESHOLD=1):
+            while url:
+                res = self.client.get(url, params)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                ids += [recipe['id'] for recipe in res.data['results']]
+                url, params = res.data['next'], None
+            res = self.client.get(
+                RECIPES_URL, {'page_size': 2, 'min_price': 0, 'page': 3}
+            )
+
+        self.assertEqual(ids, [recipe.id for recipe in reversed(recipes)])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    @patch('core.pagination.planner_estimate', return_value=10)
+    def test_list_recipes_exact_count_below_threshold(self, mock_estimate):
+        """Test small results are counted exactly"""
+        create_recipes(self.user, 3)
+
+        with self.settings(ESTIMATED_COUNT_THRESHOLD=1000):
+            res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(res.data['count'], 3)
+        self.assertFalse(res.data['count_is_estimate'])
+
+    def test_export_recipes_csv(self):
+        """Test exporting the recipes of the user as CSV"""
+        recipe = sample_recipe(user=self.user, title='Pad thai')
+        recipe.tags.add(sample_tag(user=self.user, name='Thai'))
+        recipe.tags.add(sample_tag(user=self.user, name='Dinner'))
+        recipe.ingredients.add(sample_ingredient(user=self.user))
+        user2 = create_user(email='correo@correo.com')
+        sample_recipe(user=user2, title='Not mine')
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Pad thai')
+        self.assertEqual(rows[0]['price'], '5.00')
+        self.assertEqual(rows[0]['tags'], 'Dinner;Thai')
+        self.assertEqual(rows[0]['ingredients'], 'Cinnamon')
+
+    def test_export_recipes_jsonl(self):
+        """Test exporting the recipes of the user as JSON Lines"""
+        recipe1 = sample_recipe(user=self.user, title='Pad thai')
+        recipe1.tags.add(sample_tag(user=self.user, name='Thai'))
+        recipe2 = sample_recipe(user=self.user, title='Ramen')
+
+        res = self.client.get(EXPORT_URL, {'export_format': 'jsonl'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        recipes = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [recipe['id'] for recipe in recipes],
+            [recipe1.id, recipe2.id]
+        )
+        self.assertEqual(recipes[0]['tags'], ['Thai'])
+        self.assertEqual(recipes[1]['tags'], [])
+
+    def test_export_recipes_invalid_format(self):
+        """Test exporting to an unknown format fails"""
+        res = self.client.get(EXPORT_URL, {'export_format': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_recipes_by_price_and_time_ranges(self):
+        """Test returning recipes within price and time ranges"""
+        cheap = sample_recipe(user=self.user, price=3, time_minutes=10)
+        quick = sample_recipe(user=self.user, price=8, time_minutes=5)
+        sample_recipe(user=self.user, price=20, time_minutes=5)
+        sample_recipe(user=self.user, price=6, time_minutes=60)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'min_price': '2.50', 'max_price': '10', 'max_time_minutes': 30}
+        )
+
+        self.assertEqual(
+            [item['id'] for item in res.data], [quick.id, cheap.id]
+        )
+
+    def test_invalid_range_filter(self):
+        """Test that ranges which aren't numbers are rejected"""
+        res = self.client.get(RECIPES_URL, {'min_price': 'cheap'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('min_price', res.data)
+
+    def test_order_recipes_by_price_and_time(self):
+        """Test sorting recipes with ?ordering="""
+        recipe1 = sample_recipe(user=self.user, price=7, time_minutes=20)
+        recipe2 = sample_recipe(user=self.user, price=2, time_minutes=45)
+        recipe3 = sample_recipe(user=self.user, price=7, time_minutes=5)
+
+        res = self.client.get(RECIPES_URL, {'ordering': 'price'})
+        self.assertEqual(
+            [item['id'] for item in res.data],
+            [recipe2.id, recipe1.id, recipe3.id]
+        )
+
+        res = self.client.get(RECIPES_URL, {'ordering': '-time_minutes'})
+        self.assertEqual(
+            [item['id'] for item in res.data],
+            [recipe2.id, recipe1.id, recipe3.id]
+        )
+
+    def test_batch_retrieve_recipes(self):
+        """Test retrieving several recipe details in the requested order"""
+        recipe1 = sample_recipe(user=self.user, title='Curry')
+        recipe1.tags.add(sample_tag(user=self.user))
+        recipe2 = sample_recipe(user=self.user, title='Soup')
+        other = sample_recipe(user=create_user(email='other@correo.com'))
+        ids = [recipe2.id, 9999, recipe1.id, other.id, recipe2.id]
+
+        with self.assertNumQueries(3):
+            res = self.client.get(
+                BATCH_URL, {'ids': ','.join(map(str, ids))}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [
+            RecipeDetailSerializer(recipe2).data,
+            RecipeDetailSerializer(recipe1).data,
+        ])
+        self.assertEqual(res.data['missing'], [9999, other.id])
+
+    def test_batch_retrieve_invalid_ids(self):
+        """Test that the ids must be a short list of numbers"""
+        res = self.client.get(BATCH_URL, {'ids': '1,two'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(
+            BATCH_URL, {'ids': ','.join(map(str, range(1, 202)))}
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class RecipeImageUploadTests(TestCase):
 
     def setUp(self):
         self.client = APIClient()
-        self.user = get_user_model().objects.create_user(
-            'user@correo.com',
-            'testpass'
-        )
+        self.user = create_user(email='user@correo.com')
         self.client.force_authenticate(self.user)
         # we want a recipe already created in each test we run
         self.recipe = sample_recipe(user=self.user)
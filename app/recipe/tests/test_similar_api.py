@@ -0,0 +1,126 @@
+from unittest.mock import patch
+
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.tests.factories import (
+    create_user, sample_recipe, sample_tag, sample_ingredient
+)
+
+from recipe import bitsets, indexes
+
+
+def similar_url(recipe_id):
+    """Return the similar recipes url of a recipe"""
+    return reverse('recipe:recipe-similar', args=[recipe_id])
+
+
+class SimilarRecipesApiTests(TestCase):
+    """Test the similar recipes endpoint"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+
+    def setUp(self):
+        # the indexes outlive the rolled back test transactions
+        indexes.get_registry().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.vegan = sample_tag(user=self.user, name='Vegan')
+        self.tofu = sample_ingredient(user=self.user, name='Tofu')
+        self.rice = sample_ingredient(user=self.user, name='Rice')
+        self.recipe = sample_recipe(user=self.user, title='Tofu bowl')
+        self.recipe.tags.add(self.vegan)
+        self.recipe.ingredients.add(self.tofu, self.rice)
+
+    def test_ranked_by_shared_tags_and_ingredients(self):
+        """Test that recipes are ranked by Jaccard similarity"""
+        close = sample_recipe(user=self.user, title='Tofu rice')
+        close.ingredients.add(self.tofu, self.rice)
+        far = sample_recipe(user=self.user, title='Plain rice')
+        far.ingredients.add(self.rice)
+        sample_recipe(user=self.user, title='Nothing in common')
+
+        res = self.client.get(similar_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in res.data], [close.id, far.id]
+        )
+        self.assertEqual(res.data[0]['similarity'], round(2 / 3, 4))
+        self.assertEqual(res.data[1]['similarity'], round(1 / 3, 4))
+
+    def test_index_updated_on_writes(self):
+        """Test that the cached index picks up changed links"""
+        other = sample_recipe(user=self.user, title='Rice')
+        self.client.get(similar_url(self.recipe.id))
+
+        other.ingredients.add(self.rice)
+        res = self.client.get(similar_url(self.recipe.id))
+        self.assertEqual([item['id'] for item in res.data], [other.id])
+
+        self.rice.recipe_set.remove(other)
+        res = self.client.get(similar_url(self.recipe.id))
+        self.assertEqual(res.data, [])
+
+        added = sample_recipe(user=self.user, title='Vegan')
+        added.tags.add(self.vegan)
+        other.delete()
+        res = self.client.get(similar_url(self.recipe.id))
+        self.assertEqual([item['id'] for item in res.data], [added.id])
+
+    def test_marked_dirty_again_on_commit(self):
+        """Test that a lookup made before a write commits doesn't keep the
+           rows it read
+        """
+        other = sample_recipe(user=self.user, title='Rice')
+        self.client.get(similar_url(self.recipe.id))
+        callbacks = []
+        with patch('recipe.indexes.transaction.on_commit', callbacks.append):
+            other.ingredients.add(self.rice)
+        index = indexes.get_index(self.user.id)
+        with index.lock:
+            index.refresh()
+        self.assertFalse(index.dirty)
+
+        for callback in callbacks:
+            callback()
+
+        self.assertIn(other.id, index.dirty)
+
+    def test_limit(self):
+        """Test that no more than limit recipes are returned"""
+        for i in range(5):
+            sample_recipe(user=self.user).tags.add(self.vegan)
+
+        res = self.client.get(similar_url(self.recipe.id), {'limit': 2})
+
+        self.assertEqual(len(res.data), 2)
+
+    def test_other_users_recipe_not_found(self):
+        """Test that the recipes of other users can't be compared"""
+        other = sample_recipe(user=create_user(email='other@londonappdev.com'))
+
+        res = self.client.get(similar_url(other.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class RecipeIndexTests(TestCase):
+    """Test the bitsets of the recipe index"""
+
+    def test_many_features(self):
+        """Test features spilling over more than one word per recipe"""
+        index = bitsets.RecipeIndex(user_id=1)
+        index.update([1, 2], [(1, ('tag', i)) for i in range(100)])
+        index.update([2], [(2, ('tag', i)) for i in range(50, 150)])
+
+        self.assertEqual(index.bits.shape, (2, 3))
+        self.assertEqual(
+            list(bitsets.popcount(index.bits)), [100, 100]
+        )
+        self.assertEqual(index.similar(1, 10), [(2, 50 / 150)])
@@ -0,0 +1,113 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import RecipeStats
+from core.stats import rebuild_recipe_stats
+from core.tests.factories import (
+    create_user, create_recipes, sample_recipe, sample_tag, sample_ingredient
+)
+
+
+STATS_URL = reverse('recipe:stats')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Return recipe details url"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class PublicStatsApiTests(TestCase):
+    """Test unauthenticated recipe stats API access"""
+
+    def test_auth_required(self):
+        """Test that authentication is required"""
+        res = APIClient().get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateStatsApiTests(TestCase):
+    """Test authenticated recipe stats API access"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_stats_without_recipes(self):
+        """Test the stats of a user without recipes"""
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['recipe_count'], 0)
+        self.assertIsNone(res.data['avg_price'])
+        self.assertEqual(res.data['top_tags'], [])
+
+    def test_stats_follow_recipe_writes(self):
+        """Test the totals are kept up to date on create/update/delete"""
+        recipe1 = sample_recipe(user=self.user, time_minutes=10, price=4.00)
+        sample_recipe(user=self.user, time_minutes=20, price=6.50)
+        recipe3 = sample_recipe(user=self.user, time_minutes=60, price=9.99)
+        sample_recipe(user=create_user(email='correo@correo.com'))
+
+        self.client.patch(detail_url(recipe1.id), {'time_minutes': 40})
+        recipe3.delete()
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipe_count'], 2)
+        self.assertEqual(res.data['avg_time_minutes'], 30.0)
+        self.assertEqual(res.data['avg_price'], '5.25')
+
+    def test_stats_top_tags_and_ingredients(self):
+        """Test the most used tags and ingredients are listed first"""
+        vegan = sample_tag(user=self.user, name='Vegan')
+        quick = sample_tag(user=self.user, name='Quick')
+        sample_tag(user=self.user, name='Unused')
+        salt = sample_ingredient(user=self.user, name='Salt')
+        for _ in range(2):
+            recipe = sample_recipe(user=self.user)
+            recipe.tags.add(vegan)
+            recipe.ingredients.add(salt)
+        sample_recipe(user=self.user).tags.add(quick)
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(
+            [(tag['name'], tag['recipe_count'])
+             for tag in res.data['top_tags']],
+            [('Vegan', 2), ('Quick', 1)]
+        )
+        self.assertEqual(res.data['top_ingredients'][0]['id'], salt.id)
+
+    def test_rebuild_stats_after_bulk_insert(self):
+        """Test the totals can be rebuilt after writes that skip signals"""
+        create_recipes(self.user, 4, time_minutes=15, price=2.00)
+
+        rebuild_recipe_stats([self.user.id])
+
+        stats = RecipeStats.objects.get(user=self.user)
+        self.assertEqual(stats.recipe_count, 4)
+        self.assertEqual(stats.total_time_minutes, 60)
+
+    def test_paginated_list_uses_summary_count(self):
+        """Test the unfiltered list takes its count from the summary"""
+        sample_recipe(user=self.user)
+        sample_recipe(user=self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, {'page_size': 1})
+
+        self.assertEqual(res.data['count'], 2)
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries.captured_queries)
+        )
+        self.assertEqual(len(res.data['results']), 1)
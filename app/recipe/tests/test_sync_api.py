@@ -0,0 +1,129 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Max
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ChangeLogEntry
+from core.tests.factories import (
+    create_user, sample_recipe, sample_tag, sample_ingredient
+)
+
+SYNC_URL = reverse('recipe:sync')
+
+
+def latest_cursor():
+    return ChangeLogEntry.objects.aggregate(latest=Max('id'))['latest']
+
+
+@override_settings(CHANGE_LOG_SAFETY_LAG=0)
+class SyncApiTests(TestCase):
+    """Test syncing the changes after a cursor"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = sample_tag(user=self.user, name='Vegan')
+        self.recipe = sample_recipe(user=self.user, title='Salad')
+        self.cursor = latest_cursor()
+
+    def sync(self, cursor, **params):
+        return self.client.get(SYNC_URL, {'cursor': cursor, **params})
+
+    def test_first_sync_resets(self):
+        """Test that apps without a cursor download everything"""
+        res = self.sync(0)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data['reset'])
+        self.assertEqual(res.data['cursor'], self.cursor)
+
+    def test_changes_after_cursor(self):
+        """Test that written objects and tombstones are returned"""
+        self.recipe.tags.add(self.tag)
+        ingredient = sample_ingredient(user=self.user)
+        self.tag.name = 'Vegetarian'
+        self.tag.save()
+        deleted = sample_recipe(user=self.user, title='Gone')
+        deleted_id = deleted.id
+        deleted.delete()
+        sample_tag(user=create_user(email='other@londonappdev.com'))
+
+        res = self.sync(self.cursor)
+
+        self.assertFalse(res.data['reset'])
+        self.assertFalse(res.data['has_more'])
+        # the tag of the other user is the latest change
+        self.assertEqual(res.data['cursor'], latest_cursor() - 1)
+        self.assertEqual(
+            [(item['id'], item['tags']) for item in res.data['recipes']],
+            [(self.recipe.id, [self.tag.id])]
+        )
+        self.assertEqual(res.data['tags'][0]['name'], 'Vegetarian')
+        self.assertEqual(res.data['ingredients'][0]['id'], ingredient.id)
+        self.assertEqual(res.data['deleted'], {
+            'recipes': [deleted_id], 'tags': [], 'ingredients': []
+        })
+
+    def test_nothing_changed(self):
+        """Test that an up to date app keeps its cursor"""
+        res = self.sync(self.cursor)
+
+        self.assertEqual(res.data['cursor'], self.cursor)
+        self.assertEqual(res.data['recipes'], [])
+
+    def test_paged_changes(self):
+        """Test that the changes come limit at a time"""
+        for i in range(3):
+            sample_tag(user=self.user, name=f'Tag {i}')
+
+        res = self.sync(self.cursor, limit=2)
+        self.assertTrue(res.data['has_more'])
+        self.assertEqual(len(res.data['tags']), 2)
+
+        res = self.sync(res.data['cursor'], limit=2)
+        self.assertFalse(res.data['has_more'])
+        self.assertEqual(res.data['tags'][0]['name'], 'Tag 2')
+
+    def test_pruned_cursor_resets(self):
+        """Test that a cursor older than the log kept asks for a reset"""
+        sample_tag(user=self.user, name='Dessert')
+        ChangeLogEntry.objects.exclude(id=latest_cursor()).update(
+            created_at=timezone.now() - timedelta(days=60)
+        )
+        call_command('prune_change_log', stdout=StringIO())
+
+        res = self.sync(self.cursor - 1)
+
+        self.assertTrue(res.data['reset'])
+        self.assertEqual(ChangeLogEntry.objects.count(), 1)
+
+    @override_settings(CHANGE_LOG_SAFETY_LAG=60)
+    def test_recent_changes_wait(self):
+        """Test the changes that may not be committed everywhere yet are
+           held back, the cursor doesn't move past them
+        """
+        sample_tag(user=self.user, name='Dessert')
+
+        res = self.sync(self.cursor)
+        self.assertEqual(res.data['cursor'], self.cursor)
+        self.assertEqual(res.data['tags'], [])
+        res = self.sync(0)
+        self.assertLess(res.data['cursor'], self.cursor)
+
+        ChangeLogEntry.objects.update(
+            created_at=timezone.now() - timedelta(minutes=2)
+        )
+        res = self.sync(self.cursor)
+        self.assertEqual(res.data['cursor'], latest_cursor())
+        self.assertEqual(res.data['tags'][0]['name'], 'Dessert')
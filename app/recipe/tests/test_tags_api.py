@@ -1,4 +1,3 @@
-from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import TestCase
 
@@ -7,13 +6,12 @@ from rest_framework.test import APIClient
 
 from core.models import Tag, Recipe
 
+from core.tests.factories import create_user
+
 from recipe.serializers import TagSerializer
 
 TAGS_URL = reverse('recipe:tag-list')
-
-
-def create_user(**params):
-    return get_user_model().objects.create_user(**params)
+BULK_TAGS_URL = reverse('recipe:tag-bulk')
 
 
 class PublicTagsApiTests(TestCase):
@@ -32,11 +30,11 @@ class PublicTagsApiTests(TestCase):
 class PrivateTagsApiTests(TestCase):
     """Test the authorized user tags API"""
 
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(password='password123')
+
     def setUp(self):
-        self.user = create_user(
-            email='test@correo.com',
-            password='password123'
-        )
         self.client = APIClient()
         self.client.force_authenticate(self.user)
 
@@ -132,3 +130,89 @@ class PrivateTagsApiTests(TestCase):
 
         # test will fail because we've created 2 tags. So that's the expected
         self.assertEqual(len(res.data), 1)
+
+    def test_retrieve_tags_ordered_by_recipe_count(self):
+        """Test sorting tags by the number of recipes using them"""
+        rare = Tag.objects.create(user=self.user, name='Rare')
+        common = Tag.objects.create(user=self.user, name='Common')
+        unused = Tag.objects.create(user=self.user, name='Unused')
+        for title in ('Pancakes', 'Porridge'):
+            recipe = Recipe.objects.create(
+                title=title,
+                time_minutes=5,
+                price=3.00,
+                user=self.user
+            )
+            recipe.tags.add(common)
+        recipe.tags.add(rare)
+
+        res = self.client.get(TAGS_URL, {'ordering': '-recipe_count'})
+
+        self.assertEqual(
+            [tag['id'] for tag in res.data],
+            [common.id, rare.id, unused.id]
+        )
+
+    def test_create_tag_duplicate_name(self):
+        """Test a user can't have two tags with the same name"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data)
+        self.assertEqual(
+            Tag.objects.filter(user=self.user, name='Vegan').count(), 1
+        )
+
+    def test_bulk_create_tags(self):
+        """Test getting the ids of a list of tags, existing or not"""
+        existing = Tag.objects.create(user=self.user, name='Vegan')
+        user2 = create_user(email='other@correo.com', password='testpass')
+        Tag.objects.create(user=user2, name='Dessert')
+
+        res = self.client.post(
+            BULK_TAGS_URL,
+            {'names': ['Dessert', ' Vegan', 'Dessert', 'Quick']},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(tag['name'], tag['created']) for tag in res.data],
+            [('Dessert', True), ('Vegan', False), ('Quick', True)]
+        )
+        self.assertEqual(res.data[1]['id'], existing.id)
+        tags = Tag.objects.filter(user=self.user)
+        self.assertEqual(tags.count(), 3)
+        self.assertEqual(
+            {tag['id'] for tag in res.data},
+            set(tags.values_list('id', flat=True))
+        )
+        self.assertEqual(
+            tags.get(name='Quick').name_normalized, 'quick'
+        )
+
+    def test_bulk_create_tags_again(self):
+        """Test sending the same list twice creates the tags once"""
+        payload = {'names': ['Dessert', 'Quick']}
+        first = self.client.post(BULK_TAGS_URL, payload, format='json')
+
+        res = self.client.post(BULK_TAGS_URL, payload, format='json')
+
+        self.assertEqual(
+            [tag['id'] for tag in res.data],
+            [tag['id'] for tag in first.data]
+        )
+        self.assertFalse(any(tag['created'] for tag in res.data))
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_create_tags_invalid(self):
+        """Test the names must be a list of non-empty strings"""
+        for payload in ({}, {'names': []}, {'names': 'Vegan'},
+                        {'names': ['Vegan', ' ']}, {'names': [1]},
+                        {'names': ['x' * 256]}):
+            res = self.client.post(BULK_TAGS_URL, payload, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Tag.objects.exists())
@@ -18,5 +18,7 @@ router.register('recipes', views.RecipeViewSet)
 app_name = 'recipe'
 
 urlpatterns = [
+    path('stats/', views.RecipeStatsView.as_view(), name='stats'),
+    path('sync/', views.SyncView.as_view(), name='sync'),
     path('', include(router.urls)),
 ]
@@ -1,15 +1,44 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
+
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework import viewsets, mixins, status
+from rest_framework import viewsets, mixins, status, generics, views
 # line above ables us to get acces to the CRUD functions
 # thanks to generic viwsets and mixins DRF features such as
 # create, list, retrieve...
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
-from core.models import Tag, Ingredient, Recipe
+from core.bulk import upsert_names
+from core.idempotency import idempotent
+from core.media import schedule_media_sweep
+from core.models import Tag, Ingredient, Recipe, RecipeStats
+
+from recipe import (
+    serializers, exports, autocomplete, caching, indexes, sync
+)
+from recipe.pagination import EstimatedCountPagination
+
+
+def limit_param(request, default=10, maximum=50):
+    """Return the ?limit= of a request, between 1 and maximum"""
+    try:
+        limit = int(request.query_params.get('limit', default))
+    except ValueError:
+        limit = default
+    return max(1, min(limit, maximum))
 
-from recipe import serializers
+
+def finite_decimal(value):
+    """Convert a query param to a Decimal, refusing NaN and infinity"""
+    value = Decimal(value)
+    if not value.is_finite():
+        raise ValueError(value)
+    return value
 
 
 class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
@@ -19,6 +48,11 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
     authentication_classes = (TokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
+    # orderings the list can be sorted by with ?ordering=
+    ordering_fields = ('name', '-name', 'recipe_count', '-recipe_count')
+    # most names a single bulk request can list
+    bulk_max_names = 1000
+
     # We override this mixins.ListModelMixin feature getting
     # tags associated to the user who made the request
     def get_queryset(self):
@@ -26,20 +60,91 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
         assigned_only = bool(
             int(self.request.query_params.get('assigned_only', 0))
         )
+        ordering = self.request.query_params.get('ordering')
+        if ordering not in self.ordering_fields:
+            ordering = '-name'
         queryset = self.queryset
-        # return only tags and ingredients assigned to recipes
+        # return only tags and ingredients assigned to recipes. The
+        # maintained recipe_count spares a join with the recipes
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = queryset.filter(recipe_count__gt=0)
 
         return queryset.filter(
             user=self.request.user
-        ).order_by('-name').distinct()
+        ).order_by(ordering, '-id')
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
 
         # We override this mixins.CreateModelMixin feature to be able
         # to create a new tag associated to the user who made the request
     def perform_create(self, serializer):
         """Create a new object"""
-        serializer.save(user=self.request.user)
+        try:
+            with transaction.atomic():
+                serializer.save(user=self.request.user)
+        except IntegrityError:
+            # created by a concurrent request since it was validated
+            raise ValidationError(
+                {'name': ['You already have one with this name.']}
+            )
+
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Return the objects named in a list, creating the missing ones
+           with a single insert
+        """
+        names = request.data.get('names') \
+            if isinstance(request.data, dict) else None
+        if not isinstance(names, list) or not names:
+            raise ValidationError({'names': ['A non-empty list is required.']})
+        if len(names) > self.bulk_max_names:
+            raise ValidationError({'names': [
+                f'At most {self.bulk_max_names} names per request.'
+            ]})
+        cleaned = []
+        for name in names:
+            if not isinstance(name, str) or not name.strip():
+                raise ValidationError({'names': ['Names must be non-empty '
+                                                 'strings.']})
+            if len(name.strip()) > 255:
+                raise ValidationError({'names': ['Names have at most 255 '
+                                                 'characters.']})
+            cleaned.append(name.strip())
+        # the first occurrence of a name sets its position
+        cleaned = list(dict.fromkeys(cleaned))
+
+        model = self.queryset.model
+        user_id = request.user.id
+        with transaction.atomic():
+            ids, created = upsert_names(
+                model, ((user_id, name) for name in cleaned)
+            )
+        # the raw insert skips the signals that keep it up to date
+        if created:
+            autocomplete.invalidate(model, user_id)
+
+        return Response([
+            {
+                'id': ids[(user_id, name)],
+                'name': name,
+                'created': (user_id, name) in created,
+            }
+            for name in cleaned
+        ])
+
+    @action(methods=['GET'], detail=False, url_path='autocomplete')
+    def autocomplete(self, request):
+        """Return the most used objects whose name starts with ?q="""
+        results = autocomplete.autocomplete(
+            self.queryset.model,
+            request.user.id,
+            request.query_params.get('q', ''),
+            limit_param(request)
+        )
+
+        return Response(results)
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
@@ -68,6 +173,24 @@ class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     # Here we are LISTING data from recipes which returns Recipe objects
     serializer_class = serializers.RecipeSerializer
+    pagination_class = EstimatedCountPagination
+    # query params that narrow down the list of recipes
+    filter_params = (
+        'tags', 'ingredients',
+        'min_price', 'max_price', 'min_time_minutes', 'max_time_minutes',
+    )
+    # range query params -> (lookup, type of their value)
+    range_params = {
+        'min_price': ('price__gte', finite_decimal),
+        'max_price': ('price__lte', finite_decimal),
+        'min_time_minutes': ('time_minutes__gte', int),
+        'max_time_minutes': ('time_minutes__lte', int),
+    }
+    # orderings the list can be sorted by with ?ordering=, the id tie
+    # breaker goes the same way so the (user, field, id) indexes serve it
+    ordering_fields = ('price', '-price', 'time_minutes', '-time_minutes')
+    # most recipes a single ?ids= batch can ask for
+    batch_max_ids = 200
 
     def _params_to_ints(self, qs):
         """Convert a list of string IDs to a list of integers"""
@@ -86,8 +209,57 @@ class RecipeViewSet(viewsets.ModelViewSet):
         if ingredients:
             ingredient_ids = self._params_to_ints(ingredients)
             queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+        queryset = queryset.filter(**self._range_filters())
 
-        return queryset.filter(user=self.request.user)
+        ordering = self.request.query_params.get('ordering')
+        if ordering in self.ordering_fields:
+            tie_breaker = '-id' if ordering.startswith('-') else 'id'
+            ordering = (ordering, tie_breaker)
+        else:
+            # newest first, pages need a stable ordering
+            ordering = ('-id',)
+
+        return queryset.filter(user=self.request.user).order_by(*ordering)
+
+    def _range_filters(self):
+        """Return the lookups of the min_/max_ query params given"""
+        filters = {}
+        for param, (lookup, to_value) in self.range_params.items():
+            value = self.request.query_params.get(param)
+            if not value:
+                continue
+            try:
+                filters[lookup] = to_value(value)
+            except (ValueError, ArithmeticError):
+                raise ValidationError({param: ['A valid number is required.']})
+        return filters
+
+    def get_known_count(self, queryset):
+        """Return the number of recipes of the unfiltered list, which the
+           summary of the user keeps without counting them
+        """
+        params = self.request.query_params
+        if any(params.get(param) for param in self.filter_params):
+            return None
+        return RecipeStats.objects.filter(
+            user=self.request.user
+        ).values_list('recipe_count', flat=True).first()
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return the detail of a recipe, serialized only on cache misses"""
+        try:
+            pk = int(kwargs[self.lookup_field])
+        except ValueError:
+            return super().retrieve(request, *args, **kwargs)
+        data, generation = caching.get_detail(request.user.id, pk)
+        if data is not None:
+            return Response(data)
+
+        response = super().retrieve(request, *args, **kwargs)
+        caching.set_detail(
+            request.user.id, pk, generation, dict(response.data)
+        )
+        return response
 
     # We override this function because we want to RETRIEVE data from 1 recipe
     # Then we need to get the serializer which does that
@@ -102,11 +274,16 @@ class RecipeViewSet(viewsets.ModelViewSet):
         # Othwerwise, we will return de default serializer defined lines above
         return self.serializer_class
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         """Create a new Recipe obj owned by the user who made the request"""
         serializer.save(user=self.request.user)
 
     @action(methods=['POST'], detail=True, url_path='upload-image')
+    @idempotent
     def upload_image(self, request, pk=None):
         """Upload an image to a recipe"""
         # gets the object referenced by id in the url
@@ -117,7 +294,11 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
         if serializer.is_valid():
+            replaced = bool(recipe.image)
             serializer.save()
+            if replaced:
+                # the previous image stays on disk until swept
+                schedule_media_sweep()
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
@@ -127,3 +308,162 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    @action(methods=['GET'], detail=True)
+    def similar(self, request, pk=None):
+        """Return the recipes sharing the most tags and ingredients with
+           a recipe, best match first
+        """
+        recipe = self.get_object()
+        matches = indexes.similar_recipes(
+            request.user.id, recipe.id, limit_param(request)
+        )
+
+        return Response(self._scored_recipes(matches, 'similarity'))
+
+    @action(methods=['GET'], detail=False)
+    def cookable(self, request):
+        """Return the recipes that can be cooked (or mostly) with the
+           ?ingredients= at hand, the best covered first
+        """
+        params = request.query_params
+        try:
+            ingredient_ids = self._params_to_ints(params['ingredients'])
+        except (KeyError, ValueError):
+            return Response(
+                {'ingredients': ['A comma separated list of ids.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            min_coverage = float(params.get('min_coverage', 1))
+        except ValueError:
+            min_coverage = None
+        if min_coverage is None or not 0 < min_coverage <= 1:
+            return Response(
+                {'min_coverage': ['A number greater than 0, at most 1.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        matches = indexes.cookable_recipes(
+            request.user.id,
+            ingredient_ids,
+            min_coverage,
+            limit_param(request, default=20, maximum=100)
+        )
+
+        return Response(self._scored_recipes(matches, 'coverage'))
+
+    def _scored_recipes(self, matches, score_field):
+        """Serialize the recipes of (recipe id, score) matches in order"""
+        scores = dict(matches)
+        recipes = {
+            obj.id: obj for obj in self.queryset.filter(
+                user=self.request.user, id__in=scores
+            ).prefetch_related('tags', 'ingredients')
+        }
+        # a recipe deleted since the index was refreshed is left out
+        data = self.get_serializer(
+            [recipes[pk] for pk, _ in matches if pk in recipes], many=True
+        ).data
+        for item in data:
+            item[score_field] = round(scores[item['id']], 4)
+
+        return data
+
+    @action(methods=['GET'], detail=False)
+    def batch(self, request):
+        """Return the details of the recipes listed in ?ids=, in the same
+           order, and the ids that were not found
+        """
+        try:
+            ids = self._params_to_ints(request.query_params['ids'])
+        except (KeyError, ValueError):
+            return Response(
+                {'ids': ['A comma separated list of ids.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > self.batch_max_ids:
+            return Response(
+                {'ids': [f'At most {self.batch_max_ids} ids.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        details, generations = caching.get_details(request.user.id, ids)
+        misses = [pk for pk in ids if pk not in details]
+        if misses:
+            # the same queries whatever the number of recipes
+            recipes = self.queryset.filter(
+                user=request.user, id__in=misses
+            ).prefetch_related('tags', 'ingredients')
+            fetched = {
+                item['id']: dict(item) for item in
+                serializers.RecipeDetailSerializer(recipes, many=True).data
+            }
+            caching.set_details(request.user.id, fetched, generations)
+            details.update(fetched)
+
+        return Response({
+            'results': [details[pk] for pk in ids if pk in details],
+            'missing': [pk for pk in ids if pk not in details],
+        })
+
+    @action(methods=['GET'], detail=False)
+    def export(self, request):
+        """Stream all the recipes of the user as CSV or JSON Lines"""
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in exports.EXPORTERS:
+            return Response(
+                {'export_format': [
+                    f'Choose one of: {", ".join(exports.EXPORTERS)}'
+                ]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # The rows are generated while the response is being sent, so
+        # the whole collection never has to be held in memory
+        exporter, content_type = exports.EXPORTERS[export_format]
+        response = StreamingHttpResponse(
+            exporter(self.get_queryset()),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="recipes.{export_format}"'
+
+        return response
+
+
+class RecipeStatsView(generics.RetrieveAPIView):
+    """Show statistics about the recipes of the authenticated user"""
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    serializer_class = serializers.RecipeStatsSerializer
+
+    def get_object(self):
+        """Return the summary of the user, kept up to date on writes"""
+        stats = RecipeStats.objects.filter(user=self.request.user).first()
+        # users that never wrote a recipe don't have a summary yet
+        return stats or RecipeStats(user=self.request.user)
+
+
+class SyncView(views.APIView):
+    """List the changes to the recipes, tags and ingredients of the user
+       after ?cursor=, for apps keeping a copy of them
+    """
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        try:
+            cursor = int(request.query_params.get('cursor', 0))
+        except ValueError:
+            return Response(
+                {'cursor': ['A valid integer is required.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(sync.changes_since(
+            request.user,
+            cursor,
+            limit_param(request, default=500, maximum=1000)
+        ))
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2 hasher whose work factor comes from the settings.
+
+    It keeps the pbkdf2_sha256 algorithm name, so existing hashes keep
+    working and get rehashed on login when PASSWORD_HASHING_ITERATIONS
+    changes
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASHING_ITERATIONS', None) or \
+            PBKDF2PasswordHasher.iterations
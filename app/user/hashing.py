@@ -0,0 +1,93 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HashingUnavailable(APIException):
+    """Raised when too many password hashes are already in progress"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many authentication requests, try again later.')
+    default_code = 'hashing_unavailable'
+
+    def __init__(self, wait=1):
+        super().__init__()
+        # DRF turns the wait into a Retry-After header
+        self.wait = wait
+
+
+class HashingGate:
+    """Limit how many password hashes run at the same time.
+
+    Up to `concurrency` hashes run at once and up to `queue_limit` more wait
+    at most `timeout` seconds for their turn. Anything beyond that fails
+    straight away, so a burst of logins can't take every worker thread
+    """
+
+    def __init__(self, concurrency, queue_limit, timeout):
+        self.concurrency = concurrency
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self._semaphore = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @contextmanager
+    def slot(self):
+        """Wait for a free hashing slot or raise HashingUnavailable"""
+        with self._lock:
+            if self._pending >= self.concurrency + self.queue_limit:
+                raise HashingUnavailable()
+            self._pending += 1
+        try:
+            if not self._semaphore.acquire(timeout=self.timeout):
+                raise HashingUnavailable()
+            try:
+                yield
+            finally:
+                self._semaphore.release()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+
+_gate = None
+_gate_lock = threading.Lock()
+
+
+def get_gate():
+    """Return the hashing gate of this process, built from the settings"""
+    global _gate
+    with _gate_lock:
+        if _gate is None:
+            concurrency = getattr(
+                settings, 'PASSWORD_HASHING_CONCURRENCY', None
+            ) or 1
+            _gate = HashingGate(
+                concurrency=concurrency,
+                queue_limit=getattr(
+                    settings, 'PASSWORD_HASHING_QUEUE_LIMIT', concurrency * 2
+                ),
+                timeout=getattr(settings, 'PASSWORD_HASHING_TIMEOUT', 1.0)
+            )
+        return _gate
+
+
+@receiver(setting_changed)
+def reset_gate(setting, **kwargs):
+    """Rebuild the gate when its settings are overridden (i.e. in tests)"""
+    global _gate
+    if setting.startswith('PASSWORD_HASHING_'):
+        with _gate_lock:
+            _gate = None
+
+
+def hashing_slot():
+    """Context manager guarding code that hashes or checks passwords"""
+    return get_gate().slot()
@@ -0,0 +1,59 @@
+import multiprocessing
+import os
+import time
+
+from django.contrib.auth.hashers import (
+    check_password, get_hasher, make_password
+)
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _check_passwords(args):
+    """Check a password over and over and return how many checks ran"""
+    encoded, seconds = args
+    checks = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        check_password('benchmark-password', encoded)
+        checks += 1
+    return checks
+
+
+class Command(BaseCommand):
+    """Django command to measure how many logins per second a core hashes"""
+    help = 'Benchmark password checks per second with the current hasher'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seconds', type=float, default=5.0,
+            help='How long every process keeps checking passwords'
+        )
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Processes checking passwords in parallel'
+        )
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        if processes < 1 or options['seconds'] <= 0:
+            raise CommandError('--processes and --seconds must be positive')
+
+        hasher = get_hasher()
+        encoded = make_password('benchmark-password')
+        cores = min(processes, os.cpu_count() or processes)
+        self.stdout.write(
+            f'Checking {hasher.algorithm} passwords with {processes} '
+            f'processes on {cores} cores...'
+        )
+        jobs = [(encoded, options['seconds'])] * processes
+        if processes == 1:
+            checks = [_check_passwords(jobs[0])]
+        else:
+            with multiprocessing.get_context('fork').Pool(processes) as pool:
+                checks = pool.map(_check_passwords, jobs)
+
+        per_second = sum(checks) / options['seconds']
+        self.stdout.write(self.style.SUCCESS(
+            f'{per_second:.1f} logins/s in total, '
+            f'{per_second / cores:.1f} logins/s per core'
+        ))
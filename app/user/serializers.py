@@ -3,6 +3,8 @@ from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import serializers
 
+from user.hashing import hashing_slot
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the users object"""
@@ -20,7 +22,8 @@ class UserSerializer(serializers.ModelSerializer):
 
     def create(self, validate_data):
         """Create a new user with encrypted password and return it"""
-        return get_user_model().objects.create_user(**validate_data)
+        with hashing_slot():
+            return get_user_model().objects.create_user(**validate_data)
 
     def update(self, instance, validated_data):
         """Update a user setting the password correctly and return it"""
@@ -29,7 +32,8 @@ class UserSerializer(serializers.ModelSerializer):
         user = super().update(instance, validated_data)
 
         if password:
-            user.set_password(password)
+            with hashing_slot():
+                user.set_password(password)
             user.save()
 
         return user
@@ -48,11 +52,13 @@ class AuthTokenSerializer(serializers.Serializer):
         email = attrs.get('email')
         password = attrs.get('password')
 
-        user = authenticate(
-            request=self.context.get('request'),
-            username=email,
-            password=password
-        )
+        # Checking the password is CPU heavy, so only a few run at once
+        with hashing_slot():
+            user = authenticate(
+                request=self.context.get('request'),
+                username=email,
+                password=password
+            )
         if not user:
             msg = _('Unable to authenticate with provided credentials')
             raise serializers.ValidationError(msg, code='authentication')
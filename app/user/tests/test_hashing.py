@@ -0,0 +1,120 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user.hashers import ConfigurablePBKDF2PasswordHasher
+from user.hashing import HashingGate, HashingUnavailable, get_gate
+
+
+TOKEN_URL = reverse('user:token')
+CREATE_USER_URL = reverse('user:create')
+
+
+class HashingGateTests(TestCase):
+
+    def test_slot_limits_concurrency(self):
+        """Test the gate rejects hashes beyond concurrency and queue"""
+        gate = HashingGate(concurrency=1, queue_limit=0, timeout=0)
+
+        with gate.slot():
+            with self.assertRaises(HashingUnavailable):
+                with gate.slot():
+                    pass
+        # the slot is given back once the first hash is done
+        with gate.slot():
+            pass
+
+    def test_one_hash_per_process_by_default(self):
+        """Test the gate lets a single hash run at once per process unless
+           configured otherwise
+        """
+        with self.settings(PASSWORD_HASHING_CONCURRENCY=None):
+            self.assertEqual(get_gate().concurrency, 1)
+
+    def test_queued_slot_times_out(self):
+        """Test a queued hash gives up after the timeout"""
+        gate = HashingGate(concurrency=1, queue_limit=1, timeout=0.01)
+        entered = threading.Event()
+        release = threading.Event()
+
+        def hold_slot():
+            with gate.slot():
+                entered.set()
+                release.wait()
+
+        holder = threading.Thread(target=hold_slot)
+        holder.start()
+        entered.wait()
+        try:
+            with self.assertRaises(HashingUnavailable):
+                with gate.slot():
+                    pass
+        finally:
+            release.set()
+            holder.join()
+
+
+@override_settings(
+    PASSWORD_HASHING_CONCURRENCY=1,
+    PASSWORD_HASHING_QUEUE_LIMIT=0,
+    PASSWORD_HASHING_TIMEOUT=0
+)
+class SaturatedHashingApiTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_token_unavailable_when_saturated(self):
+        """Test logins fail fast with 503 while hashing is saturated"""
+        get_user_model().objects.create_user('test@correo.com', 'testpass')
+        payload = {'email': 'test@correo.com', 'password': 'testpass'}
+
+        with get_gate().slot():
+            res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn('Retry-After', res)
+        self.assertEqual(
+            self.client.post(TOKEN_URL, payload).status_code,
+            status.HTTP_200_OK
+        )
+
+    def test_create_user_unavailable_when_saturated(self):
+        """Test sign ups fail fast with 503 while hashing is saturated"""
+        payload = {
+            'email': 'test@correo.com',
+            'password': 'testpass',
+            'name': 'Test name'
+        }
+
+        with get_gate().slot():
+            res = self.client.post(CREATE_USER_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(get_user_model().objects.exists())
+
+
+class ConfigurableHasherTests(TestCase):
+
+    @override_settings(PASSWORD_HASHING_ITERATIONS=1000)
+    def test_iterations_from_settings(self):
+        """Test the PBKDF2 work factor is read from the settings"""
+        hasher = ConfigurablePBKDF2PasswordHasher()
+        encoded = hasher.encode('testpass', hasher.salt())
+
+        self.assertEqual(encoded.split('$')[:2], ['pbkdf2_sha256', '1000'])
+
+    def test_rehash_when_iterations_change(self):
+        """Test hashes with another work factor are marked for update"""
+        hasher = ConfigurablePBKDF2PasswordHasher()
+        encoded = hasher.encode('testpass', hasher.salt(), iterations=1000)
+
+        with override_settings(PASSWORD_HASHING_ITERATIONS=2000):
+            self.assertTrue(hasher.must_update(encoded))
+        with override_settings(PASSWORD_HASHING_ITERATIONS=1000):
+            self.assertFalse(hasher.must_update(encoded))
@@ -6,6 +6,8 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.tests.factories import create_user
+
 # this is a constant. that's why we write it uppercase
 CREATE_USER_URL = reverse('user:create')
 # line above create the url assigned to create a new user
@@ -13,10 +15,6 @@ TOKEN_URL = reverse('user:token')
 ME_URL = reverse('user:me')
 
 
-def create_user(**params):
-    return get_user_model().objects.create_user(**params)
-
-
 # public api refers to an unauthenticated user. AKA guests
 class PublicUserApiTests(TestCase):
     """Test the users API (public/guests)"""
@@ -151,3 +149,12 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_delete_me_not_allowed(self):
+        """Test that users can't delete their account through the API"""
+        res = self.client.delete(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertTrue(
+            get_user_model().objects.filter(pk=self.user.pk).exists()
+        )